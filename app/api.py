@@ -1,16 +1,83 @@
-from fastapi import APIRouter, Depends, Query
+import os
+import io
+import csv
+import asyncio
+import orjson
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse, PlainTextResponse
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from app.database import get_session
-from app.schemas import ProviderOut, AskRequest, AskResponse
-from app.utils.geo import zip_to_latlon, haversine_km
-from app.crud import providers_by_drg
-from app.nlp import parse_question_llm
-import asyncio
+from app.database import get_session, SessionLocal
+from app.schemas import ProviderOut, AskRequest, AskResponse, BatchRequest
+from app.utils.geo import zip_to_latlon
+from app.crud import latest_data_year, providers_by_drg, providers_page, resolve_sort_key, stream_providers
+from app.cache import response_cache
+from app.ranking import RANKINGS, rank
+from app.batch import run_batch
+from app import metrics, snapshot, warmup
+from app.metrics import span
+from app.nlp import parse_question_llm, ensure_vocabulary, resolve_drg_text
 
 router = APIRouter()
 
-@router.get("/providers", response_model=List[ProviderOut], tags=["providers"])
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "5000"))
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "2"))
+
+EXPORT_FIELDS = list(ProviderOut.model_fields)
+
+metrics.gauge("response_cache_hits_total", "Response cache hits.", lambda: response_cache.hits, "counter")
+metrics.gauge("response_cache_misses_total", "Response cache misses.", lambda: response_cache.misses, "counter")
+
+latest_year = {"version": None, "year": None}
+
+async def default_year(session: AsyncSession, version: int, year: Optional[int]) -> Optional[int]:
+    # Without an explicit year only the most recent loaded data year is served, so a provider is not listed
+    # once per year. None when no rows carry a year.
+    if year is not None:
+        return year
+    snap = snapshot.active()
+    if snap and snap.version == version:
+        return snap.latest_year
+    if latest_year["version"] != version:
+        latest_year["year"] = await latest_data_year(session)
+        latest_year["version"] = version
+    return latest_year["year"]
+
+def split_drg(drg: Optional[str]):
+    if not drg:
+        return None, None
+    try:
+        return int(drg), None
+    except ValueError:
+        return None, drg
+
+def normalize_zip(z: Optional[str]) -> Optional[str]:
+    if not z:
+        return None
+    return str(z).strip()[:5].zfill(5)
+
+def answer_text(ranking: str, r, zip_code: str, drg_label) -> str:
+    if ranking == "best":
+        return f"Top rating near {zip_code}: {r['provider_name']} ({round(r['rating_avg'],1) if r['rating_avg'] is not None else 'N/A'}/10) for DRG {drg_label}."
+    if ranking == "nearest":
+        return f"Nearest to {zip_code}: {r['provider_name']} at {round(r['distance_km'],1) if r['distance_km'] is not None else 'N/A'} km for DRG {drg_label}."
+    if ranking == "score":
+        return f"Best value near {zip_code}: {r['provider_name']} with estimated covered charges {r['average_covered_charges']}, rating {round(r['rating_avg'],1) if r['rating_avg'] is not None else 'N/A'}/10 for DRG {drg_label}."
+    return f"Cheapest near {zip_code}: {r['provider_name']} with estimated covered charges {r['average_covered_charges']} for DRG {drg_label}."
+
+def ask_response(answer: str, data=None) -> ORJSONResponse:
+    return ORJSONResponse({"answer": answer, "data": data or []})
+
+def normalize_text(t: Optional[str]) -> Optional[str]:
+    if not t:
+        return None
+    return " ".join(str(t).lower().split())
+
+# /providers and /ask return ORJSONResponse directly: rows are already plain dicts of str/int/float/None
+# shaped like ProviderOut, so FastAPI's response_model validation pass is skipped (the model still documents them).
+@router.get("/providers", response_model=List[ProviderOut], response_class=ORJSONResponse, tags=["providers"])
+@metrics.handler
 async def get_providers(
     drg: Optional[str] = Query(None),
     zip: Optional[str] = Query(None),
@@ -19,81 +86,166 @@ async def get_providers(
     offset: int = Query(0, ge=0),
     sort_by: str = Query("average_covered_charges"),
     order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    rank_by: Optional[str] = Query(None, description="Top-k ranking instead of sort_by: cheapest, best, nearest or score"),
+    year: Optional[int] = Query(None, description="CMS data year; the latest loaded year when omitted"),
     session: AsyncSession = Depends(get_session),
 ):
-    drg_code = None
-    drg_text = None
-    if drg:
-        try:
-            drg_code = int(drg)
-        except ValueError:
-            drg_text = drg
-    base = await providers_by_drg(session, drg_code, drg_text)
+    if rank_by and rank_by not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"rank_by must be one of {', '.join(RANKINGS)}")
+    drg_code, drg_text = split_drg(drg)
+    snap = snapshot.active()
+    version = snap.version if snap else await response_cache.version(session)
+    year = await default_year(session, version, year)
+    drg_codes = None
+    if drg_text:
+        await ensure_vocabulary(session, version)
+        drg_codes = resolve_drg_text(drg_text) or None
     center = None
     if zip:
         center = zip_to_latlon(zip)
-    out = []
-    for r in base:
-        d = dict(r)
-        d["distance_km"] = None
-        if center and r["provider_zip_code"]:
-            p = zip_to_latlon(r["provider_zip_code"])
-            if p:
-                d["distance_km"] = haversine_km(center[0], center[1], p[0], p[1])
-        out.append(d)
-    if center and radius_km:
-        out = [x for x in out if x["distance_km"] is not None and x["distance_km"] <= radius_km]
-    key = sort_by
-    reverse = order == "desc"
-    if key == "rating":
-        key = "rating_avg"
-    if key not in out[0] if out else ["average_covered_charges"]:
-        key = "average_covered_charges"
-    out.sort(key=lambda x: (float("inf") if x[key] is None else x[key]), reverse=reverse)
-    out = out[offset:offset+limit]
-    return out
-
-@router.post("/ask", response_model=AskResponse, tags=["assistant"])
+    params = {
+        "drg_code": drg_code,
+        "drg_text": normalize_text(drg_text),
+        "zip": normalize_zip(zip),
+        "radius_km": radius_km if center else None,
+        "sort_by": resolve_sort_key(sort_by, center),
+        "order": "desc" if order == "desc" else "asc",
+        "limit": limit,
+        "offset": offset,
+        "cursor": cursor,
+        "rank_by": rank_by,
+        "year": year,
+    }
+    async def compute():
+        if rank_by:
+            if snap:
+                rows = snap.providers(drg_code, drg_text, center, radius_km, drg_codes, year)
+            else:
+                rows = await providers_by_drg(session, drg_code, drg_text, center, radius_km, drg_codes, year)
+            with span("rank"):
+                return rank(rows, (rank_by,), offset + limit, radius_km=radius_km)[rank_by][offset:], None
+        if snap:
+            return snap.page(drg_code, drg_text, center, radius_km, sort_by, order, limit, offset, cursor, drg_codes, year)
+        return await providers_page(session, drg_code, drg_text, center, radius_km, sort_by, order, limit, offset, cursor, drg_codes, year)
+    try:
+        out, next_cursor = await response_cache.cached(session, "providers", params, compute, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(out, headers=headers)
+
+@router.get("/providers/export", tags=["providers"], response_class=StreamingResponse)
+async def get_providers_export(
+    drg: Optional[str] = Query(None),
+    zip: Optional[str] = Query(None),
+    radius_km: Optional[float] = Query(None),
+    sort_by: str = Query("average_covered_charges"),
+    order: str = Query("asc"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    year: Optional[int] = Query(None, description="CMS data year; the latest loaded year when omitted"),
+):
+    drg_code, drg_text = split_drg(drg)
+    center = zip_to_latlon(zip) if zip else None
+    async def rows():
+        async with SessionLocal() as session:
+            version = await response_cache.version(session)
+            drg_codes = None
+            if drg_text:
+                await ensure_vocabulary(session, version)
+                drg_codes = resolve_drg_text(drg_text) or None
+            async for part in stream_providers(session, drg_code, drg_text, center, radius_km, sort_by, order, drg_codes, await default_year(session, version, year)):
+                yield part
+    async def ndjson():
+        async for part in rows():
+            yield b"".join(orjson.dumps(r) + b"\n" for r in part)
+    async def csv_lines():
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        async for part in rows():
+            writer.writerows(part)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+    if format == "csv":
+        headers = {"Content-Disposition": 'attachment; filename="providers.csv"'}
+        return StreamingResponse(csv_lines(), media_type="text/csv", headers=headers)
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.post("/providers/batch", tags=["providers"], response_class=StreamingResponse)
+async def post_providers_batch(payload: BatchRequest):
+    if len(payload.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX_QUERIES} queries per batch")
+    async def lines():
+        # the request-scoped session is closed before a streaming body runs, so the stream owns its own
+        async with SessionLocal() as session:
+            version = await response_cache.version(session)
+            async for line in run_batch(session, payload.queries, version, await default_year(session, version, None)):
+                yield line
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/ask", response_model=AskResponse, response_class=ORJSONResponse, tags=["assistant"])
+@metrics.handler
 async def post_ask(payload: AskRequest, session: AsyncSession = Depends(get_session)):
+    snap = snapshot.active()
+    version = snap.version if snap else await response_cache.version(session)
+    await ensure_vocabulary(session, version)
+    year = await default_year(session, version, payload.year)
     parsed = await parse_question_llm(payload.question)
     drg_code = parsed.get("drg_code")
     drg_text = parsed.get("drg_text")
+    drg_codes = parsed.get("drg_codes") or (resolve_drg_text(drg_text) if drg_text and not drg_code else None)
     zip_code = parsed.get("zip")
     radius_km = parsed.get("radius_km", 40.0)
     if not drg_code and not drg_text:
-        return AskResponse(answer="Provide a DRG code or description.")
+        return ask_response("Provide a DRG code or description.")
     if not zip_code:
-        return AskResponse(answer="Provide a valid ZIP code.")
-    base = await providers_by_drg(session, drg_code, drg_text)
+        return ask_response("Provide a valid ZIP code.")
     center = zip_to_latlon(zip_code)
     if not center:
-        return AskResponse(answer="ZIP not found.")
-    enriched = []
-    for r in base:
-        d = dict(r)
-        d["distance_km"] = None
-        if r["provider_zip_code"]:
-            p = zip_to_latlon(r["provider_zip_code"])
-            if p:
-                d["distance_km"] = haversine_km(center[0], center[1], p[0], p[1])
-        enriched.append(d)
-    enriched = [x for x in enriched if x["distance_km"] is not None and x["distance_km"] <= radius_km]
-    async def cheapest():
-        y = sorted(enriched, key=lambda x: (float("inf") if x["average_covered_charges"] is None else x["average_covered_charges"]))
-        return y[:5]
-    async def best():
-        y = sorted(enriched, key=lambda x: (-1 if x["rating_avg"] is None else x["rating_avg"]), reverse=True)
-        return y[:5]
-    cheapest_task = cheapest()
-    best_task = best()
-    cheap, top = await asyncio.gather(cheapest_task, best_task)
+        return ask_response("ZIP not found.")
     intent = parsed.get("intent", "cost")
-    if intent == "quality" and top:
-        t = top[0]
-        a = f"Top rating near {zip_code}: {t['provider_name']} ({round(t['rating_avg'],1) if t['rating_avg'] is not None else 'N/A'}/10) for DRG {drg_code or drg_text}."
-        return AskResponse(answer=a, data=top)
-    if cheap:
-        c = cheap[0]
-        a = f"Cheapest near {zip_code}: {c['provider_name']} with estimated covered charges {c['average_covered_charges']} for DRG {drg_code or drg_text}."
-        return AskResponse(answer=a, data=cheap)
-    return AskResponse(answer="No results found.")
+    ranking = payload.rank_by or ("best" if intent == "quality" else "cheapest")
+    params = {
+        "drg_code": drg_code,
+        "drg_text": normalize_text(drg_text),
+        "zip": normalize_zip(zip_code),
+        "radius_km": radius_km,
+        "ranking": ranking,
+        "year": year,
+    }
+    async def compute():
+        if snap:
+            enriched = snap.providers(drg_code, drg_text, center, radius_km, drg_codes, year)
+        else:
+            enriched = await providers_by_drg(session, drg_code, drg_text, center, radius_km, drg_codes, year)
+        with span("rank"):
+            top = rank(enriched, (ranking,), 5, radius_km=radius_km)[ranking]
+        if top:
+            return {"answer": answer_text(ranking, top[0], zip_code, drg_code or drg_text), "data": top}
+        return {"answer": "No results found."}
+    out = await response_cache.cached(session, "ask", params, compute, version)
+    return ask_response(out["answer"], out.get("data"))
+
+@router.get("/cache/stats", tags=["ops"])
+async def get_cache_stats():
+    return response_cache.stats()
+
+@router.get("/metrics", tags=["ops"], response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/ready", tags=["ops"])
+async def get_ready():
+    body = {"status": "starting", "startup_seconds": warmup.state["phases"], "error": warmup.state["error"]}
+    if not warmup.state["ready"]:
+        return ORJSONResponse(body, status_code=503)
+    try:
+        async with SessionLocal() as session:
+            await asyncio.wait_for(session.execute(text("SELECT 1")), READY_TIMEOUT)
+    except Exception as e:
+        return ORJSONResponse({**body, "status": "database unavailable", "error": repr(e)}, status_code=503)
+    return {**body, "status": "ready"}
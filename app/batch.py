@@ -0,0 +1,80 @@
+import orjson
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import providers_with_coords, resolve_sort_key
+from app.nlp import ensure_vocabulary, resolve_drg_text
+from app.ranking import DEFAULT_WEIGHTS, column, ranking_keys, top_k
+from app.schemas import BatchQuery
+from app.utils.geo import zip_to_latlon, haversine_km_many
+
+CENTER_BLOCK = 256
+
+NUMERIC_COLUMNS = ("total_discharges", "average_covered_charges", "average_total_payments", "average_medicare_payments", "rating_avg")
+
+def drg_group(drg: str) -> Tuple[str, Any]:
+    try:
+        return "code", int(drg)
+    except ValueError:
+        return "text", " ".join(drg.lower().split())
+
+def group_queries(queries: List[BatchQuery], default_year: Optional[int] = None) -> Dict[Tuple[str, Any, Any], List[int]]:
+    groups: Dict[Tuple[str, Any, Any], List[int]] = {}
+    for i, q in enumerate(queries):
+        groups.setdefault((*drg_group(q.drg), default_year if q.year is None else q.year), []).append(i)
+    return groups
+
+def distance_matrix(centers: List[Tuple[float, float]], lat: np.ndarray, lon: np.ndarray):
+    c = np.asarray(centers, dtype=np.float64)
+    for start in range(0, len(c), CENTER_BLOCK):
+        block = c[start:start + CENTER_BLOCK]
+        yield start, haversine_km_many(block[:, 0:1], block[:, 1:2], lat[None, :], lon[None, :])
+
+def select_rows(q: BatchQuery, cols: Dict[str, np.ndarray], dist, has_center: bool) -> np.ndarray:
+    n = len(cols["average_covered_charges"])
+    idx = np.arange(n)
+    if has_center and q.radius_km:
+        idx = np.flatnonzero(dist <= q.radius_km)
+    if q.rank_by:
+        keys = ranking_keys(q.rank_by, {**cols, "distance_km": dist}, DEFAULT_WEIGHTS, q.radius_km)
+    else:
+        key = resolve_sort_key(q.sort_by, has_center)
+        v = dist if key == "distance_km" else cols[key]
+        keys = np.where(np.isnan(v), np.inf, -v if q.order == "desc" else v)
+    return idx[top_k(keys[idx], q.limit)]
+
+def result_line(i: int, q: BatchQuery, rows: List[Dict[str, Any]], sel: np.ndarray, dist) -> bytes:
+    out = []
+    for j in sel.tolist():
+        d = None if dist is None or np.isnan(dist[j]) else float(dist[j])
+        out.append({**rows[j], "distance_km": d})
+    return orjson.dumps({"index": i, "id": q.id, "drg": q.drg, "zip": q.zip, "results": out}) + b"\n"
+
+async def run_batch(session: AsyncSession, queries: List[BatchQuery], version: int, default_year: Optional[int] = None):
+    groups = group_queries(queries, default_year)
+    if any(kind == "text" for kind, _, _ in groups):
+        await ensure_vocabulary(session, version)
+    for (kind, value, year), members in groups.items():
+        if kind == "code":
+            rows, lat, lon = await providers_with_coords(session, value, None, None, year)
+        else:
+            rows, lat, lon = await providers_with_coords(session, None, value, resolve_drg_text(value) or None, year)
+        cols = {c: column(rows, c) for c in NUMERIC_COLUMNS}
+        lat = np.array([np.nan if v is None else v for v in lat], dtype=np.float64)
+        lon = np.array([np.nan if v is None else v for v in lon], dtype=np.float64)
+        located = []
+        for i in members:
+            q = queries[i]
+            center = zip_to_latlon(q.zip) if q.zip else None
+            if center is None:
+                empty = np.full(len(rows), np.nan)
+                yield result_line(i, q, rows, select_rows(q, cols, empty, False), None)
+            else:
+                located.append((i, center))
+        if not located:
+            continue
+        for start, block in distance_matrix([c for _, c in located], lat, lon):
+            for row_i, dist in enumerate(block):
+                i = located[start + row_i][0]
+                q = queries[i]
+                yield result_line(i, q, rows, select_rows(q, cols, dist, True), dist)
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import data_version
+
+class MemoryCache:
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.data: "OrderedDict[str, Any]" = OrderedDict()
+
+    async def get(self, key: str):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value):
+        self.data[key] = (time.monotonic() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self.data)
+
+class RedisCache:
+    name = "redis"
+
+    def __init__(self, client, ttl: float = 300.0, prefix: str = "hcn:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = 300.0):
+        import redis.asyncio as redis
+        return cls(redis.from_url(url), ttl)
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    def size(self) -> Optional[int]:
+        return None
+
+class ResponseCache:
+    def __init__(self, backend, version_ttl: float = 5.0):
+        self.backend = backend
+        self.version_ttl = version_ttl
+        self.current_version = None
+        self.version_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def version(self, session: AsyncSession) -> int:
+        now = time.monotonic()
+        if self.current_version is None or now - self.version_checked > self.version_ttl:
+            self.current_version = await data_version(session)
+            self.version_checked = now
+        return self.current_version
+
+    @staticmethod
+    def key(namespace: str, version: int, params: Dict[str, Any]) -> str:
+        raw = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{namespace}:{version}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    async def cached(self, session: AsyncSession, namespace: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]], version: Optional[int] = None):
+        if self.backend is None:
+            return await compute()
+        if version is None:
+            version = await self.version(session)
+        key = self.key(namespace, version, params)
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            value = None
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await compute()
+        try:
+            await self.backend.set(key, value)
+        except Exception:
+            self.errors += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "size": self.backend.size() if self.backend else None,
+            "data_version": self.current_version,
+        }
+
+def build_cache() -> ResponseCache:
+    kind = os.getenv("CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv("CACHE_TTL", "300"))
+    version_ttl = float(os.getenv("CACHE_VERSION_TTL", "5"))
+    if kind == "none":
+        return ResponseCache(None, version_ttl)
+    if kind == "redis":
+        return ResponseCache(RedisCache.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl), version_ttl)
+    return ResponseCache(MemoryCache(int(os.getenv("CACHE_MAX_ENTRIES", "1024")), ttl), version_ttl)
+
+response_cache = build_cache()
@@ -1,11 +1,75 @@
-from typing import Optional
+import math
+import json
+import base64
+from decimal import Decimal
+from typing import Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.models import Provider, DrgPrice, Rating
+from sqlalchemy import select, func, null, tuple_, type_coerce, Float
+from app.models import Provider, DrgPrice, ProviderRatingStats, DataVersion
+from app.schemas import ProviderOut
+from app.utils.geo import R_KM, bounding_box
+from app.metrics import span, rows as count_rows
 
-async def providers_by_drg(session: AsyncSession, drg_code: Optional[int], drg_text: Optional[str]):
+PROVIDER_FIELDS = tuple(ProviderOut.model_fields)
+
+SORT_KEYS = {
+    "average_covered_charges": "average_covered_charges",
+    "average_total_payments": "average_total_payments",
+    "average_medicare_payments": "average_medicare_payments",
+    "total_discharges": "total_discharges",
+    "rating": "rating_avg",
+    "rating_avg": "rating_avg",
+    "distance_km": "distance_km",
+}
+
+def distance_km_expr(lat: float, lon: float):
+    dlat = func.sin(func.radians(Provider.latitude - lat) * 0.5)
+    dlon = func.sin(func.radians(Provider.longitude - lon) * 0.5)
+    a = dlat * dlat + math.cos(math.radians(lat)) * func.cos(func.radians(Provider.latitude)) * dlon * dlon
+    return 2 * R_KM * func.asin(func.sqrt(func.least(a, 1.0)))
+
+KEY_COLUMNS = {
+    "average_covered_charges": DrgPrice.average_covered_charges,
+    "average_total_payments": DrgPrice.average_total_payments,
+    "average_medicare_payments": DrgPrice.average_medicare_payments,
+    "total_discharges": DrgPrice.total_discharges,
+    "rating_avg": ProviderRatingStats.rating_avg,
+}
+
+def encode_cursor(value, last_id: int) -> str:
+    raw = json.dumps([None if value is None else str(value), last_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(raw)
+        if value is not None:
+            value = float(value) if key == "distance_km" else Decimal(value)
+        return value, int(last_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def resolve_sort_key(sort_by: Optional[str], center) -> str:
+    key = SORT_KEYS.get(sort_by or "", "average_covered_charges")
+    if key == "distance_km" and not center:
+        key = "average_covered_charges"
+    return key
+
+def providers_query(
+    drg_code: Optional[int],
+    drg_text: Optional[str],
+    center: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    drg_codes: Optional[Sequence[int]] = None,
+    year: Optional[int] = None,
+):
+    distance = distance_km_expr(center[0], center[1]) if center else null().cast(Float)
+    # Columns after id follow PROVIDER_FIELDS. Numeric columns are coerced to Float on the Python side only,
+    # so rows come back as ready floats while SQL (and index use in ORDER BY / WHERE) is unchanged.
     q = (
         select(
+            DrgPrice.id,
             Provider.provider_id,
             Provider.provider_name,
             Provider.provider_city,
@@ -14,48 +78,162 @@ async def providers_by_drg(session: AsyncSession, drg_code: Optional[int], drg_t
             DrgPrice.ms_drg_definition,
             DrgPrice.ms_drg_code,
             DrgPrice.total_discharges,
-            DrgPrice.average_covered_charges,
-            DrgPrice.average_total_payments,
-            DrgPrice.average_medicare_payments,
-            func.avg(Rating.rating).label("rating_avg")
+            type_coerce(DrgPrice.average_covered_charges, Float).label("average_covered_charges"),
+            type_coerce(DrgPrice.average_total_payments, Float).label("average_total_payments"),
+            type_coerce(DrgPrice.average_medicare_payments, Float).label("average_medicare_payments"),
+            type_coerce(ProviderRatingStats.rating_avg, Float).label("rating_avg"),
+            distance.label("distance_km"),
+            DrgPrice.data_year,
         )
         .join(DrgPrice, DrgPrice.provider_id == Provider.provider_id)
-        .join(Rating, Rating.provider_id == Provider.provider_id, isouter=True)
-        .group_by(
-            Provider.provider_id,
-            Provider.provider_name,
-            Provider.provider_city,
-            Provider.provider_state,
-            Provider.provider_zip_code,
-            DrgPrice.ms_drg_definition,
-            DrgPrice.ms_drg_code,
-            DrgPrice.total_discharges,
-            DrgPrice.average_covered_charges,
-            DrgPrice.average_total_payments,
-            DrgPrice.average_medicare_payments
-        )
+        .join(ProviderRatingStats, ProviderRatingStats.provider_id == Provider.provider_id, isouter=True)
     )
     if drg_code is not None:
         q = q.where(DrgPrice.ms_drg_code == drg_code)
+    elif drg_codes:
+        q = q.where(DrgPrice.ms_drg_code.in_(list(drg_codes)))
     elif drg_text:
         like = f"%{drg_text}%"
         q = q.where(DrgPrice.ms_drg_definition.ilike(like))
-    r = await session.execute(q)
-    rows = r.all()
-    out = []
-    for row in rows:
-        out.append({
-            "provider_id": row.provider_id,
-            "provider_name": row.provider_name,
-            "provider_city": row.provider_city,
-            "provider_state": row.provider_state,
-            "provider_zip_code": row.provider_zip_code,
-            "ms_drg_definition": row.ms_drg_definition,
-            "ms_drg_code": row.ms_drg_code,
-            "total_discharges": int(row.total_discharges) if row.total_discharges is not None else None,
-            "average_covered_charges": float(row.average_covered_charges) if row.average_covered_charges is not None else None,
-            "average_total_payments": float(row.average_total_payments) if row.average_total_payments is not None else None,
-            "average_medicare_payments": float(row.average_medicare_payments) if row.average_medicare_payments is not None else None,
-            "rating_avg": float(row.rating_avg) if row.rating_avg is not None else None
-        })
-    return out
+    if year is not None:
+        q = q.where(DrgPrice.data_year == year)
+    if center and radius_km:
+        lat_min, lat_max, lon_min, lon_max = bounding_box(center[0], center[1], radius_km)
+        q = q.where(
+            Provider.latitude.between(lat_min, lat_max),
+            Provider.longitude.between(lon_min, lon_max),
+            distance <= radius_km,
+        )
+    return q
+
+def row_to_dict(row):
+    return dict(zip(PROVIDER_FIELDS, row[1:]))
+
+async def providers_by_drg(
+    session: AsyncSession,
+    drg_code: Optional[int],
+    drg_text: Optional[str],
+    center: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    drg_codes: Optional[Sequence[int]] = None,
+    year: Optional[int] = None,
+):
+    with span("db.providers_by_drg"):
+        r = await session.execute(providers_query(drg_code, drg_text, center, radius_km, drg_codes, year))
+        rows = r.all()
+    count_rows("providers_by_drg", len(rows))
+    with span("rows.to_dict"):
+        return [row_to_dict(row) for row in rows]
+
+async def providers_with_coords(
+    session: AsyncSession,
+    drg_code: Optional[int],
+    drg_text: Optional[str],
+    drg_codes: Optional[Sequence[int]] = None,
+    year: Optional[int] = None,
+):
+    q = providers_query(drg_code, drg_text, None, None, drg_codes, year).add_columns(Provider.latitude, Provider.longitude).order_by(DrgPrice.id)
+    with span("db.providers_with_coords"):
+        r = await session.execute(q)
+        rows = r.all()
+    count_rows("providers_with_coords", len(rows))
+    with span("rows.to_dict"):
+        return [row_to_dict(row) for row in rows], [row.latitude for row in rows], [row.longitude for row in rows]
+
+def ordered_query(q, key: str, order: str):
+    # Order and compare on the table column, not the Float-coerced select column, so keyset binds stay numeric.
+    # id follows the key's direction so the (ms_drg_code, key, id) indexes serve both orders.
+    col = KEY_COLUMNS.get(key)
+    if col is None:
+        col = q.selected_columns[key]
+    if order == "desc":
+        return q.order_by(col.desc().nulls_last(), DrgPrice.id.desc()), col
+    return q.order_by(col.asc().nulls_last(), DrgPrice.id.asc()), col
+
+def keyset_after(q, col, value, last_id: int, desc: bool):
+    # Row comparison on (key, id) lets the index seek to the cursor. It never matches NULL keys, which sort
+    # last and are paged by id on their own.
+    if value is None:
+        return q.where(col.is_(None), DrgPrice.id < last_id if desc else DrgPrice.id > last_id)
+    key = tuple_(col, DrgPrice.id)
+    return q.where(key < tuple_(value, last_id) if desc else key > tuple_(value, last_id))
+
+async def stream_providers(
+    session: AsyncSession,
+    drg_code: Optional[int],
+    drg_text: Optional[str],
+    center: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    sort_by: Optional[str] = None,
+    order: str = "asc",
+    drg_codes: Optional[Sequence[int]] = None,
+    year: Optional[int] = None,
+    batch_size: int = 1000,
+):
+    q, _ = ordered_query(providers_query(drg_code, drg_text, center, radius_km, drg_codes, year), resolve_sort_key(sort_by, center), order)
+    result = await session.stream(q.execution_options(yield_per=batch_size))
+    total = 0
+    async for rows in result.partitions():
+        total += len(rows)
+        yield [row_to_dict(row) for row in rows]
+    count_rows("stream_providers", total)
+
+async def providers_page(
+    session: AsyncSession,
+    drg_code: Optional[int],
+    drg_text: Optional[str],
+    center: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    sort_by: Optional[str] = None,
+    order: str = "asc",
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    drg_codes: Optional[Sequence[int]] = None,
+    year: Optional[int] = None,
+):
+    key = resolve_sort_key(sort_by, center)
+    q, col = ordered_query(providers_query(drg_code, drg_text, center, radius_km, drg_codes, year), key, order)
+    if key in KEY_COLUMNS:
+        # The cursor carries the exact column value; a Float-coerced one would not compare equal to the NUMERIC.
+        q = q.add_columns(col.label("cursor_value"))
+    desc = order == "desc"
+    value = None
+    page = q
+    if cursor:
+        value, last_id = decode_cursor(cursor, key)
+        page = keyset_after(q, col, value, last_id, desc)
+    with span("db.providers_page"):
+        r = await session.execute(page.offset(offset).limit(limit))
+        rows = r.all()
+        if value is not None and len(rows) < limit:
+            # Past the last non-NULL key: continue into the NULL tail.
+            tail_offset = 0
+            if offset and not rows:
+                tail_offset = max(0, offset - await session.scalar(select(func.count()).select_from(page.order_by(None).subquery())))
+            tail = q.where(col.is_(None)).offset(tail_offset).limit(limit - len(rows))
+            r = await session.execute(tail)
+            rows += r.all()
+    count_rows("providers_page", len(rows))
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.cursor_value if key in KEY_COLUMNS else last.distance_km, last.id)
+    with span("rows.to_dict"):
+        return [row_to_dict(row) for row in rows], next_cursor
+
+async def latest_data_year(session: AsyncSession) -> Optional[int]:
+    r = await session.execute(select(func.max(DrgPrice.data_year)))
+    return r.scalar()
+
+async def data_version(session: AsyncSession) -> int:
+    r = await session.execute(select(DataVersion.version).where(DataVersion.id == 1))
+    return r.scalar() or 0
+
+async def drg_definitions(session: AsyncSession):
+    r = await session.execute(
+        select(DrgPrice.ms_drg_code, DrgPrice.ms_drg_definition)
+        .where(DrgPrice.ms_drg_code.is_not(None))
+        .distinct()
+    )
+    return [(row.ms_drg_code, row.ms_drg_definition) for row in r.all()]
@@ -1,5 +1,25 @@
+import time
+started = time.perf_counter()  # before the app imports, for the startup breakdown on /ready
+import os
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.api import router
+from app.metrics import TimingMiddleware
+from app import warmup
 
-app = FastAPI(title="MS-DRG Provider API", version="1.0.0", description="Search providers and ask questions")
+warmup.state["phases"]["imports"] = round(time.perf_counter() - started, 3)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background so the process answers /ready (503) immediately; see app/warmup.py.
+    task = asyncio.create_task(warmup.run(float(os.getenv("SNAPSHOT_POLL_SECONDS", "30"))))
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+app = FastAPI(title="MS-DRG Provider API", version="1.0.0", description="Search providers and ask questions", lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(TimingMiddleware)
 app.include_router(router, prefix="")
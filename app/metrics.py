@@ -0,0 +1,157 @@
+import os
+import time
+import random
+import bisect
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 200, 500, 1000, 5000, 10000, 50000, 100000)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+
+registry: List["Histogram"] = []
+gauges: List[Tuple[str, str, str, Callable[[], float]]] = []
+
+def label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], List] = {}
+        registry.append(self)
+
+    def observe(self, value: float, *labels: str):
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, n) in sorted(self.series.items()):
+            acc = 0
+            for le, c in zip(self.buckets + ("+Inf",), counts):
+                acc += c
+                bucket = label_text(self.labels, values, 'le="%s"' % le)
+                out.append(f"{self.name}_bucket{bucket} {acc}")
+            out.append(f"{self.name}_sum{label_text(self.labels, values)} {total}")
+            out.append(f"{self.name}_count{label_text(self.labels, values)} {n}")
+        return out
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency until the last body chunk is sent.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Latency of instrumented request stages.", ("stage",))
+QUERY_ROWS = Histogram("db_query_rows", "Rows returned per query.", ("query",), ROW_BUCKETS)
+POOL_WAIT_SECONDS = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection (includes connecting).")
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "LLM parse call duration by outcome.", ("outcome",))
+
+def gauge(name: str, help: str, fn: Callable[[], float], kind: str = "gauge"):
+    gauges.append((name, help, kind, fn))
+
+def render() -> str:
+    out: List[str] = []
+    for h in registry:
+        out.extend(h.render())
+    for name, help, kind, fn in gauges:
+        out += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {fn()}"]
+    return "\n".join(out) + "\n"
+
+# Per-request stage timings, read back by the middleware for slow-request logs.
+request_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("request_stages", default=None)
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage)
+    stages = request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+def rows(query: str, n: int):
+    QUERY_ROWS.observe(n, query)
+
+def handler(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with span("handler"):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def start_profiler():
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return None
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler
+
+def save_profile(profiler, scope, elapsed_ms: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{int(time.time() * 1000)}-{route_label(scope).strip('/').replace('/', '_') or 'root'}-{elapsed_ms:.0f}ms.txt"
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        f.write(f"{scope['method']} {scope['path']}?{scope.get('query_string', b'').decode()}\n")
+        f.write(profiler.output_text(unicode=True))
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stages: List[Tuple[str, float]] = []
+        token = request_stages.set(stages)
+        status = [500]
+        profiler = start_profiler()
+        t0 = time.perf_counter()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            elapsed = time.perf_counter() - t0
+            handled = sum(s for name, s in stages if name == "handler")
+            if handled:
+                # What FastAPI does after the endpoint returns: response_model validation, JSON encoding, send.
+                record("response", elapsed - handled)
+            request_stages.reset(token)
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route_label(scope), str(status[0]))
+            elapsed_ms = elapsed * 1000
+            slow = SLOW_REQUEST_MS and elapsed_ms >= SLOW_REQUEST_MS
+            if profiler is not None:
+                profiler.stop()
+                if slow:
+                    save_profile(profiler, scope, elapsed_ms)
+            if slow:
+                detail = " ".join(f"{name}={s * 1000:.1f}ms" for name, s in stages)
+                print(f"slow request: {scope['method']} {scope['path']} {status[0]} {elapsed_ms:.1f}ms {detail}", flush=True)
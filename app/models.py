@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Numeric, ForeignKey, Text, BigInteger, SmallInteger, TIMESTAMP, func
+from sqlalchemy import String, Integer, Numeric, Float, ForeignKey, Text, BigInteger, SmallInteger, TIMESTAMP, func
 from typing import Optional, List
 
 class Base(DeclarativeBase):
@@ -12,8 +12,11 @@ class Provider(Base):
     provider_city: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     provider_state: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     provider_zip_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    latitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    longitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     prices: Mapped[List["DrgPrice"]] = relationship(back_populates="provider")
     ratings: Mapped[List["Rating"]] = relationship(back_populates="provider")
+    rating_stats: Mapped[Optional["ProviderRatingStats"]] = relationship(back_populates="provider")
 
 class DrgPrice(Base):
     __tablename__ = "drg_prices"
@@ -25,6 +28,7 @@ class DrgPrice(Base):
     average_covered_charges: Mapped[Optional[float]] = mapped_column(Numeric, nullable=True)
     average_total_payments: Mapped[Optional[float]] = mapped_column(Numeric, nullable=True)
     average_medicare_payments: Mapped[Optional[float]] = mapped_column(Numeric, nullable=True)
+    data_year: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
     provider: Mapped["Provider"] = relationship(back_populates="prices")
 
 class Rating(Base):
@@ -34,3 +38,17 @@ class Rating(Base):
     rating: Mapped[int] = mapped_column(SmallInteger)
     created_at: Mapped[Optional[str]] = mapped_column(TIMESTAMP, server_default=func.now())
     provider: Mapped["Provider"] = relationship(back_populates="ratings")
+
+class ProviderRatingStats(Base):
+    __tablename__ = "provider_rating_stats"
+    provider_id: Mapped[str] = mapped_column(ForeignKey("providers.provider_id", ondelete="CASCADE"), primary_key=True)
+    rating_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    rating_sum: Mapped[int] = mapped_column(BigInteger, default=0)
+    rating_avg: Mapped[Optional[float]] = mapped_column(Numeric, nullable=True)
+    provider: Mapped["Provider"] = relationship(back_populates="rating_stats")
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[Optional[str]] = mapped_column(TIMESTAMP, server_default=func.now())
@@ -1,43 +1,253 @@
 import os
 import json
 import re
-from typing import Dict, Any
+import math
+import time
+import bisect
+import difflib
+import asyncio
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from app.cache import MemoryCache
+from app.crud import drg_definitions
+from app.metrics import LLM_SECONDS, span
+
+DRG_RE = re.compile(r"\bdrg\s*(\d{3})\b", re.IGNORECASE)
+ZIP_RE = re.compile(r"\b(\d{5})\b")
+RADIUS_RE = re.compile(r"\b(\d+(?:\.\d+)?)\s*(km|kilometers|kilometres|miles|mi)\b", re.IGNORECASE)
+QUALITY_RE = re.compile(r"\b(?:best|highest|ratings?|rated|quality)\b", re.IGNORECASE)
+TOKEN_RE = re.compile(r"[a-z]+")
+MILES = {"mi", "miles"}
+CODE_PREFIX_RE = re.compile(r"^\s*(\d{3})\s*-")
+# CMS writes severity as "w CC", "W/O CC/MCC", "WITH MCC", "without CC/MCC"; both sides are canonicalized first.
+W_RE = re.compile(r"\bw(?:/o)?\b(?!/)")
+QUALIFIER_RE = re.compile(r"\b(with|without)\s+(cc/mcc|mcc|cc)\b")
+QUALIFIER_TOKENS = re.compile(r"wo?(?:ccmcc|mcc|cc)")
+
+STOPWORDS = {
+    "a", "an", "and", "or", "of", "the", "for", "in", "on", "to", "w", "o", "with", "without", "except",
+    "cc", "mcc", "misc", "other", "major", "minor", "principal", "secondary", "dx", "proc", "procedures",
+    "who", "what", "where", "which", "is", "are", "has", "have", "near", "within", "around", "me", "my",
+    "cheapest", "cheap", "best", "top", "highest", "lowest", "rating", "ratings", "quality", "cost", "price",
+    "km", "mi", "miles", "kilometers", "kilometres", "drg", "zip", "hospital", "hospitals", "today",
+}
+
+def canonical(text: str) -> str:
+    text = text.lower()
+    if "&" in text:
+        text = text.replace("&", " and ")
+    if "w/" in text or "w " in text or text.endswith("w"):
+        text = W_RE.sub(lambda m: "without" if len(m.group(0)) > 1 else "with", text)
+    return " ".join(text.split())
+
+def qualifier_token(m) -> str:
+    # "with cc" -> "wcc", "without cc/mcc" -> "woccmcc": one token per severity level, never fuzzy-matched.
+    return ("w" if m.group(1) == "with" else "wo") + m.group(2).replace("/", "")
+
+def tokens(canon: str) -> List[Tuple[str, str]]:
+    # (token, matched text) pairs. Severity qualifiers discriminate between sibling DRGs, so they are kept
+    # as whole phrases; the connectives and cc/mcc on their own stay stopwords.
+    out = []
+    if "cc" in canon:
+        out = [(qualifier_token(m), m.group(0)) for m in QUALIFIER_RE.finditer(canon)]
+        canon = QUALIFIER_RE.sub(" ", canon)
+    for tok in TOKEN_RE.findall(canon):
+        if tok not in STOPWORDS and len(tok) > 1:
+            out.append((tok, tok))
+    return out
+
+class DrgVocabulary:
+    def __init__(self, entries: Iterable[Tuple[int, str]]):
+        self.postings: Dict[str, Set[int]] = {}
+        self.definitions: Dict[int, str] = {}
+        self.exact: Dict[str, Set[int]] = {}
+        texts: Set[Tuple[str, int]] = set()
+        for code, definition in entries:
+            if code is None or not definition:
+                continue
+            code = int(code)
+            self.definitions.setdefault(code, definition)
+            canon = canonical(definition)
+            texts.add((canon, code))
+            self.exact.setdefault(canon, set()).add(code)
+            self.exact.setdefault(CODE_PREFIX_RE.sub("", canon).strip(), set()).add(code)
+            for tok, _ in tokens(canon):
+                self.postings.setdefault(tok, set()).add(code)
+        self.texts = sorted(texts)
+        self.corpus = "\n".join(definition for definition, _ in self.texts)
+        n = max(len(self.definitions), 1)
+        self.idf = {t: math.log(1 + n / len(codes)) for t, codes in self.postings.items()}
+        self.tokens = sorted(t for t in self.postings if not QUALIFIER_TOKENS.fullmatch(t))
+        self.memo: Dict[str, List[str]] = {}
+
+    def match_token(self, tok: str) -> List[str]:
+        if tok in self.postings:
+            return [tok]
+        if QUALIFIER_TOKENS.fullmatch(tok):
+            return []
+        hit = self.memo.get(tok)
+        if hit is None:
+            if len(self.memo) > 50000:
+                self.memo.clear()
+            hit = self.memo[tok] = self.fuzzy_match(tok)
+        return hit
+
+    def fuzzy_match(self, tok: str) -> List[str]:
+        if len(tok) < 4:
+            return []
+        stem = tok[:max(4, len(tok) - 3)]
+        i = bisect.bisect_left(self.tokens, stem)
+        out = []
+        while i < len(self.tokens) and self.tokens[i].startswith(stem):
+            out.append(self.tokens[i])
+            i += 1
+        if out:
+            return out
+        return difflib.get_close_matches(tok, self.tokens, n=1, cutoff=0.85)
+
+    def match_definition(self, canon: str) -> List[int]:
+        # What the ILIKE filter matched before: a leading "NNN -" code, the exact definition, or a substring
+        # of definitions (compared canonicalized, so "w/o" and "without" or "&" and "and" agree).
+        m = CODE_PREFIX_RE.match(canon)
+        if m and int(m.group(1)) in self.definitions:
+            return [int(m.group(1))]
+        if not canon:
+            return []
+        if canon in self.exact:
+            return sorted(self.exact[canon])
+        if canon not in self.corpus:
+            return []
+        return sorted({code for definition, code in self.texts if canon in definition})
+
+    def resolve(self, text: str, limit: int = 10) -> Tuple[List[int], List[str]]:
+        canon = canonical(text)
+        codes = self.match_definition(canon)
+        if codes:
+            return codes, [text.strip()]
+        scores: Dict[int, float] = {}
+        matched = []
+        for tok, word in tokens(canon):
+            hits = self.match_token(tok)
+            if not hits:
+                continue
+            matched.append(word)
+            for h in hits:
+                w = self.idf[h] / len(hits)
+                for code in self.postings[h]:
+                    scores[code] = scores.get(code, 0.0) + w
+        if not scores:
+            return [], []
+        top = max(scores.values())
+        codes = sorted(c for c, v in scores.items() if v >= top - 1e-9)
+        return codes[:limit], matched
+
+vocabulary: Optional[DrgVocabulary] = None
+vocabulary_version: Optional[int] = None
+vocabulary_lock = asyncio.Lock()
+
+async def ensure_vocabulary(session, version: int) -> Optional[DrgVocabulary]:
+    global vocabulary, vocabulary_version
+    if vocabulary is not None and vocabulary_version == version:
+        return vocabulary
+    async with vocabulary_lock:
+        if vocabulary is None or vocabulary_version != version:
+            with span("nlp.vocabulary_build"):
+                entries = await drg_definitions(session)
+                vocabulary = await asyncio.to_thread(DrgVocabulary, entries)
+            vocabulary_version = version
+    return vocabulary
+
+def resolve_drg_text(text: Optional[str]) -> List[int]:
+    if not text or vocabulary is None:
+        return []
+    return vocabulary.resolve(text)[0]
 
 def parse_question_offline(q: str) -> Dict[str, Any]:
     d = {}
-    m = re.search(r"\bdrg\s*(\d{3})\b", q, re.IGNORECASE)
+    m = DRG_RE.search(q)
     if m:
         d["drg_code"] = int(m.group(1))
-    m = re.search(r"\b(\d{5})\b", q)
+    m = ZIP_RE.search(q)
     if m:
         d["zip"] = m.group(1)
-    m = re.search(r"\b(\d+)\s*(?:km|kilometers|kilometres|miles|mi)\b", q, re.IGNORECASE)
+    m = RADIUS_RE.search(q)
     if m:
         v = float(m.group(1))
-        if re.search(r"\bmi|miles\b", q, re.IGNORECASE):
+        if m.group(2).lower() in MILES:
             v = v * 1.60934
         d["radius_km"] = v
-    if re.search(r"\bbest|highest|rating|quality\b", q, re.IGNORECASE):
+    if "drg_code" not in d and vocabulary is not None:
+        with span("nlp.resolve_drg"):
+            codes, words = vocabulary.resolve(q)
+        if codes:
+            d["drg_codes"] = codes
+            d["drg_text"] = " ".join(words)
+    if QUALITY_RE.search(q):
         d["intent"] = "quality"
     else:
         d["intent"] = "cost"
     return d
 
+SYSTEM_PROMPT = "Return strict JSON with keys: drg_code:int optional, drg_text:str optional, zip:str optional, radius_km:float optional, intent in [cost,quality]. Convert miles to km."
+
+parse_cache = MemoryCache(int(os.getenv("PARSE_CACHE_SIZE", "1024")), float(os.getenv("PARSE_CACHE_TTL", "86400")))
+
+def normalize_question(q: str) -> str:
+    return " ".join(q.lower().split())
+
+def llm_timeout() -> float:
+    return float(os.getenv("LLM_TIMEOUT", "8"))
+
+@lru_cache(maxsize=1)
+def llm_client():
+    import httpx
+    from openai import AsyncOpenAI
+    pool = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+        timeout=httpx.Timeout(llm_timeout(), connect=min(3.0, llm_timeout())),
+    )
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        max_retries=0,
+        http_client=http_client,
+    )
+
 async def parse_question_llm(q: str) -> Dict[str, Any]:
     key = os.getenv("OPENAI_API_KEY")
     if not key or os.getenv("ENABLE_LLM", "true").lower() != "true":
         return parse_question_offline(q)
-    from openai import OpenAI
-    client = OpenAI(api_key=key)
-    system = "Return strict JSON with keys: drg_code:int optional, drg_text:str optional, zip:str optional, radius_km:float optional, intent in [cost,quality]. Convert miles to km."
+    nq = normalize_question(q)
+    hit = await parse_cache.get(nq)
+    if hit is not None:
+        return dict(hit)
     user = f"Question: {q}"
-    r = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL","gpt-4o-mini"),
-        messages=[{"role":"system","content":system},{"role":"user","content":user}],
-        temperature=0
-    )
-    txt = r.choices[0].message.content.strip()
+    t0 = time.perf_counter()
+    try:
+        with span("nlp.llm"):
+            r = await asyncio.wait_for(
+                llm_client().chat.completions.create(
+                    model=os.getenv("OPENAI_MODEL","gpt-4o-mini"),
+                    messages=[{"role":"system","content":SYSTEM_PROMPT},{"role":"user","content":user}],
+                    temperature=0
+                ),
+                timeout=llm_timeout()
+            )
+    except asyncio.TimeoutError:
+        LLM_SECONDS.observe(time.perf_counter() - t0, "timeout")
+        return parse_question_offline(q)
+    except Exception:
+        LLM_SECONDS.observe(time.perf_counter() - t0, "error")
+        return parse_question_offline(q)
+    txt = (r.choices[0].message.content or "").strip()
     try:
-        return json.loads(txt)
+        parsed = json.loads(txt)
     except Exception:
+        parsed = None
+    if not isinstance(parsed, dict):
+        LLM_SECONDS.observe(time.perf_counter() - t0, "invalid")
         return parse_question_offline(q)
+    LLM_SECONDS.observe(time.perf_counter() - t0, "ok")
+    await parse_cache.set(nq, parsed)
+    return dict(parsed)
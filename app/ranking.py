@@ -0,0 +1,60 @@
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+RANKINGS = ("cheapest", "best", "nearest", "score")
+
+DEFAULT_WEIGHTS = {"cost": 1.0, "quality": 1.0, "distance": 0.5}
+
+COLUMNS = {
+    "cheapest": ("average_covered_charges",),
+    "best": ("rating_avg",),
+    "nearest": ("distance_km",),
+    "score": ("average_covered_charges", "rating_avg", "distance_km"),
+}
+
+def column(rows: List[Dict[str, Any]], name: str) -> np.ndarray:
+    return np.fromiter((np.nan if r[name] is None else r[name] for r in rows), np.float64, len(rows))
+
+def ranking_keys(name: str, cols: Dict[str, np.ndarray], weights: Dict[str, float], radius_km: Optional[float]) -> np.ndarray:
+    # Lower key ranks first; missing values sort last like the old float("inf") / -1 sort keys.
+    if name == "cheapest":
+        c = cols["average_covered_charges"]
+        return np.where(np.isnan(c), np.inf, c)
+    if name == "best":
+        r = cols["rating_avg"]
+        return np.where(np.isnan(r), 1.0, -r)
+    if name == "nearest":
+        d = cols["distance_km"]
+        return np.where(np.isnan(d), np.inf, d)
+    # Weighted cost/quality/distance: log(cost) keeps the score scale-free, ratings are on a 1-10
+    # scale and distance is relative to the search radius.
+    c, r, d = cols["average_covered_charges"], cols["rating_avg"], cols["distance_km"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = np.where(np.isnan(c) | (c <= 0), np.inf, np.log(np.where(c > 0, c, 1.0)))
+    q = np.where(np.isnan(r), 0.5, 1.0 - r / 10.0)
+    dist = np.where(np.isnan(d), 1.0, np.minimum(d / (radius_km or 100.0), 1.0))
+    return weights["cost"] * cost + weights["quality"] * q + weights["distance"] * dist
+
+def top_k(keys: np.ndarray, k: int) -> np.ndarray:
+    if len(keys) > k:
+        kth = np.partition(keys, k - 1)[k - 1]
+        idx = np.flatnonzero(keys <= kth)
+    else:
+        idx = np.arange(len(keys))
+    # ties keep input order, matching a stable sort
+    return idx[np.lexsort((idx, keys[idx]))][:k]
+
+def rank(
+    rows: Iterable[Dict[str, Any]],
+    rank_by: Sequence[str] = RANKINGS,
+    k: int = 5,
+    weights: Optional[Dict[str, float]] = None,
+    radius_km: Optional[float] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    rows = rows if isinstance(rows, list) else list(rows)
+    if k <= 0 or not rows:
+        return {name: [] for name in rank_by}
+    needed = {c for name in rank_by for c in COLUMNS[name]}
+    cols = {c: column(rows, c) for c in needed}
+    w = {**DEFAULT_WEIGHTS, **(weights or {})}
+    return {name: [rows[i] for i in top_k(ranking_keys(name, cols, w, radius_km), k).tolist()] for name in rank_by}
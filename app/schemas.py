@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class ProviderOut(BaseModel):
     provider_id: str
@@ -15,10 +15,27 @@ class ProviderOut(BaseModel):
     average_medicare_payments: Optional[float]
     rating_avg: Optional[float] = Field(default=None)
     distance_km: Optional[float] = Field(default=None)
+    data_year: Optional[int] = Field(default=None)
 
 class AskRequest(BaseModel):
     question: str
+    rank_by: Optional[Literal["cheapest", "best", "nearest", "score"]] = None
+    year: Optional[int] = None
 
 class AskResponse(BaseModel):
     answer: str
     data: List[ProviderOut] = []
+
+class BatchQuery(BaseModel):
+    id: Optional[str] = None
+    drg: str
+    zip: Optional[str] = None
+    radius_km: Optional[float] = None
+    limit: int = Field(default=50, ge=1, le=200)
+    sort_by: str = "average_covered_charges"
+    order: Literal["asc", "desc"] = "asc"
+    rank_by: Optional[Literal["cheapest", "best", "nearest", "score"]] = None
+    year: Optional[int] = None
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
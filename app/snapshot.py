@@ -0,0 +1,185 @@
+import os
+import asyncio
+import numpy as np
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Provider, DrgPrice, ProviderRatingStats
+from app.crud import PROVIDER_FIELDS, data_version, decode_cursor, encode_cursor, resolve_sort_key
+from app.utils.geo import haversine_km_many
+from app import nlp
+from app.metrics import span, rows as count_rows
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TEXT_COLUMNS = ("provider_id", "provider_name", "provider_city", "provider_state", "provider_zip_code", "ms_drg_definition")
+FLOAT_COLUMNS = ("total_discharges", "average_covered_charges", "average_total_payments", "average_medicare_payments", "rating_avg", "latitude", "longitude", "data_year")
+
+def nullable(a: np.ndarray) -> list:
+    out = a.astype(object)
+    out[np.isnan(a)] = None
+    return out.tolist()
+
+class Snapshot:
+    def __init__(self, frame: "pd.DataFrame", version: int):
+        import pandas as pd
+        frame = frame.assign(ms_drg_code=pd.to_numeric(frame["ms_drg_code"], errors="coerce").fillna(-1).astype(np.int64))
+        frame = frame.sort_values(["ms_drg_code", "id"], kind="stable").reset_index(drop=True)
+        self.version = version
+        self.size = len(frame)
+        self.ids = frame["id"].to_numpy(dtype=np.int64)
+        self.codes = frame["ms_drg_code"].to_numpy()
+        self.text = {c: frame[c].astype(object).where(frame[c].notna(), None).to_numpy() for c in TEXT_COLUMNS}
+        self.num = {c: pd.to_numeric(frame[c], errors="coerce").to_numpy(dtype=np.float64) for c in FLOAT_COLUMNS}
+        years = self.num["data_year"]
+        self.latest_year = int(np.nanmax(years)) if np.isfinite(years).any() else None
+        self.code_values, self.code_starts = np.unique(self.codes, return_index=True)
+        self.code_ends = np.append(self.code_starts[1:], self.size)
+        defs, self.def_index = np.unique(self.text["ms_drg_definition"].astype(str), return_inverse=True)
+        self.defs_lower = [d.lower() for d in defs]
+
+    def definitions(self) -> List[Tuple[int, str]]:
+        out = {}
+        for code, start in zip(self.code_values.tolist(), self.code_starts.tolist()):
+            if code >= 0:
+                out[code] = self.text["ms_drg_definition"][start]
+        return list(out.items())
+
+    def code_rows(self, code: int) -> np.ndarray:
+        i = np.searchsorted(self.code_values, code)
+        if i < len(self.code_values) and self.code_values[i] == code:
+            return np.arange(self.code_starts[i], self.code_ends[i])
+        return np.empty(0, dtype=np.int64)
+
+    def candidates(self, drg_code: Optional[int], drg_text: Optional[str], drg_codes: Optional[Sequence[int]]) -> np.ndarray:
+        if drg_code is not None:
+            return self.code_rows(drg_code)
+        if drg_codes:
+            return np.concatenate([self.code_rows(c) for c in sorted(set(drg_codes))])
+        if drg_text:
+            t = drg_text.lower()
+            hits = [i for i, d in enumerate(self.defs_lower) if t in d]
+            return np.flatnonzero(np.isin(self.def_index, hits))
+        return np.arange(self.size)
+
+    def filtered(self, drg_code, drg_text, center, radius_km, drg_codes, year=None):
+        idx = self.candidates(drg_code, drg_text, drg_codes)
+        if year is not None:
+            idx = idx[self.num["data_year"][idx] == year]
+        if not center:
+            return idx, np.full(len(idx), np.nan)
+        dist = haversine_km_many(center[0], center[1], self.num["latitude"][idx], self.num["longitude"][idx])
+        if radius_km:
+            keep = dist <= radius_km
+            idx, dist = idx[keep], dist[keep]
+        return idx, dist
+
+    def to_dicts(self, idx: np.ndarray, dist: np.ndarray) -> List[Dict[str, Any]]:
+        # Column-wise conversion to Python objects, then one dict per row in PROVIDER_FIELDS order.
+        n = self.num
+        columns = [self.text[c][idx].tolist() for c in TEXT_COLUMNS]
+        columns.append([None if c < 0 else c for c in self.codes[idx].tolist()])
+        columns.append([None if v != v else int(v) for v in n["total_discharges"][idx].tolist()])
+        columns += [nullable(n[c][idx]) for c in ("average_covered_charges", "average_total_payments", "average_medicare_payments", "rating_avg")]
+        columns.append(nullable(dist))
+        columns.append([None if v != v else int(v) for v in n["data_year"][idx].tolist()])
+        return [dict(zip(PROVIDER_FIELDS, r)) for r in zip(*columns)]
+
+    def providers(self, drg_code, drg_text, center=None, radius_km=None, drg_codes=None, year=None) -> List[Dict[str, Any]]:
+        with span("snapshot.providers"):
+            idx, dist = self.filtered(drg_code, drg_text, center, radius_km, drg_codes, year)
+        count_rows("snapshot.providers", len(idx))
+        with span("rows.to_dict"):
+            return self.to_dicts(idx, dist)
+
+    def page(self, drg_code, drg_text, center=None, radius_km=None, sort_by=None, order="asc", limit=50, offset=0, cursor=None, drg_codes=None, year=None):
+        # Same ordering and keyset semantics as crud.providers_page: (key NULLS LAST, id).
+        with span("snapshot.page"):
+            return self.keyset_page(drg_code, drg_text, center, radius_km, sort_by, order, limit, offset, cursor, drg_codes, year)
+
+    def keyset_page(self, drg_code, drg_text, center, radius_km, sort_by, order, limit, offset, cursor, drg_codes, year):
+        key = resolve_sort_key(sort_by, center)
+        idx, dist = self.filtered(drg_code, drg_text, center, radius_km, drg_codes, year)
+        v = dist if key == "distance_km" else self.num[key][idx]
+        desc = order == "desc"
+        keys = np.where(np.isnan(v), np.inf, -v if desc else v)
+        ids = self.ids[idx]
+        # ties and the NULL tail follow the key's direction by id, like the SQL ordering
+        tie = -ids if desc else ids
+        if cursor:
+            value, last_id = decode_cursor(cursor, key)
+            ct = -last_id if desc else last_id
+            if value is None:
+                keep = np.isnan(v) & (tie > ct)
+            else:
+                ck = -float(value) if desc else float(value)
+                keep = (keys > ck) | ((keys == ck) & (tie > ct))
+            idx, dist, keys, ids, tie, v = idx[keep], dist[keep], keys[keep], ids[keep], tie[keep], v[keep]
+        order_idx = np.lexsort((tie, keys))[offset:offset + limit]
+        rows = self.to_dicts(idx[order_idx], dist[order_idx])
+        next_cursor = None
+        if len(rows) == limit:
+            j = order_idx[-1]
+            last = None if np.isnan(v[j]) else float(v[j])
+            next_cursor = encode_cursor(last, int(ids[j]))
+        return rows, next_cursor
+
+current: Optional[Snapshot] = None
+
+def active() -> Optional[Snapshot]:
+    return current
+
+def swap(snap: Snapshot):
+    global current
+    nlp.vocabulary = nlp.DrgVocabulary(snap.definitions())
+    nlp.vocabulary_version = snap.version
+    current = snap
+
+def serving_mode() -> str:
+    return os.getenv("SERVING_MODE", "sql").lower()
+
+async def load_frame(session: AsyncSession) -> "pd.DataFrame":
+    import pandas as pd
+    q = (
+        select(
+            DrgPrice.id,
+            Provider.provider_id,
+            Provider.provider_name,
+            Provider.provider_city,
+            Provider.provider_state,
+            Provider.provider_zip_code,
+            Provider.latitude,
+            Provider.longitude,
+            DrgPrice.ms_drg_definition,
+            DrgPrice.ms_drg_code,
+            DrgPrice.total_discharges,
+            DrgPrice.average_covered_charges,
+            DrgPrice.average_total_payments,
+            DrgPrice.average_medicare_payments,
+            ProviderRatingStats.rating_avg,
+            DrgPrice.data_year,
+        )
+        .join(DrgPrice, DrgPrice.provider_id == Provider.provider_id)
+        .join(ProviderRatingStats, ProviderRatingStats.provider_id == Provider.provider_id, isouter=True)
+    )
+    r = await session.execute(q)
+    return pd.DataFrame(r.all(), columns=list(r.keys()))
+
+async def load_snapshot(session: AsyncSession) -> Snapshot:
+    version = await data_version(session)
+    frame = await load_frame(session)
+    return await asyncio.to_thread(Snapshot, frame, version)
+
+async def refresh_loop(session_factory, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as session:
+                if current is not None and await data_version(session) == current.version:
+                    continue
+                swap(await load_snapshot(session))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"snapshot: refresh failed: {e!r}", flush=True)
@@ -1,22 +1,89 @@
-import pgeocode
+import os
 import math
+import threading
+import numpy as np
 from functools import lru_cache
+from app.metrics import span
+
+R_KM = 6371.0
+N_ZIPS = 100000
+
+_zip_index_lock = threading.Lock()
+
+ZIP_FIELDS = ["postal_code", "place_name", "state_code", "latitude", "longitude"]
+
+@lru_cache(maxsize=1)
+def zip_dataset():
+    # pgeocode downloads the GeoNames US file once and caches it as CSV under its STORAGE_DIR; read that file
+    # with an explicit schema rather than through Nominatim's internal frames. pgeocode (and pandas) are
+    # imported on first use (startup warm-up) rather than with the app.
+    import pandas as pd
+    import pgeocode
+    path = os.path.join(pgeocode.STORAGE_DIR, "US.txt")
+    if not os.path.exists(path):
+        pgeocode.Nominatim("us")
+    return pd.read_csv(
+        path,
+        usecols=ZIP_FIELDS,
+        dtype={"postal_code": str, "place_name": str, "state_code": str},
+        keep_default_na=False,
+        na_values=[""],
+    )
+
+def zip_index():
+    # The warm-up builds this in a thread while early requests may ask for it on the event loop; build it once.
+    with _zip_index_lock:
+        return build_zip_index()
 
 @lru_cache(maxsize=1)
-def nomi():
-    return pgeocode.Nominatim("us")
+def build_zip_index():
+    # Direct-address table: row i holds the centroid of ZIP i (mean over its places), NaN when unknown.
+    with span("geo.load_dataset"):
+        df = zip_dataset()
+    zip5 = df["postal_code"].str.slice(0, 5)
+    ok = zip5.str.fullmatch(r"\d{5}", na=False)
+    centroids = df[ok].groupby(zip5[ok])[["latitude", "longitude"]].mean()
+    idx = centroids.index.to_numpy().astype(np.int64)
+    lat = np.full(N_ZIPS, np.nan, dtype=np.float64)
+    lon = np.full(N_ZIPS, np.nan, dtype=np.float64)
+    lat[idx] = centroids["latitude"].to_numpy(dtype=np.float64)
+    lon[idx] = centroids["longitude"].to_numpy(dtype=np.float64)
+    return lat, lon
+
+def zip_codes(zips):
+    out = np.full(len(zips), -1, dtype=np.int64)
+    for i, z in enumerate(zips):
+        if z is None:
+            continue
+        s = str(z).strip()[:5]
+        if s.isdigit():
+            out[i] = int(s)
+    return out
+
+def zips_to_latlon(zips):
+    lat_t, lon_t = zip_index()
+    codes = zip_codes(zips)
+    ok = codes >= 0
+    lat = np.full(len(codes), np.nan, dtype=np.float64)
+    lon = np.full(len(codes), np.nan, dtype=np.float64)
+    lat[ok] = lat_t[codes[ok]]
+    lon[ok] = lon_t[codes[ok]]
+    return lat, lon
 
 def zip_to_latlon(zip_code: str):
-    z = str(zip_code).zfill(5)
-    r = nomi().query_postal_code(z)
-    if r is None or r.latitude is None or r.longitude is None:
+    with span("geo.zip_to_latlon"):
+        lat, lon = zips_to_latlon([str(zip_code).zfill(5)])
+    if np.isnan(lat[0]) or np.isnan(lon[0]):
         return None
-    return float(r.latitude), float(r.longitude)
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return R * c
+    return float(lat[0]), float(lon[0])
+
+def bounding_box(lat, lon, radius_km):
+    dlat = math.degrees(radius_km / R_KM)
+    c = math.cos(math.radians(lat))
+    dlon = 180.0 if c < 1e-9 else min(180.0, math.degrees(radius_km / (R_KM * c)))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def haversine_km_many(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
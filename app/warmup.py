@@ -0,0 +1,60 @@
+import os
+import time
+import asyncio
+from typing import Any, Dict
+from app.database import SessionLocal, warm_pool
+from app.crud import data_version, providers_by_drg, providers_page
+from app.nlp import ensure_vocabulary
+from app.utils.geo import zip_index
+from app import metrics, snapshot
+
+WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", "4"))
+WARM_CENTER = (40.7506, -73.9972)
+
+# Statement shapes of the hot paths. DRG -1 matches nothing, so these only pay for planning.
+HOT_QUERIES = (
+    data_version,
+    lambda s: providers_page(s, -1, None),
+    lambda s: providers_page(s, -1, None, WARM_CENTER, 50.0, "distance_km"),
+    lambda s: providers_by_drg(s, -1, None, WARM_CENTER, 40.0),
+)
+
+state: Dict[str, Any] = {"ready": False, "phases": {}, "error": None}
+
+metrics.gauge("startup_ready_seconds", "Seconds from startup until /ready first succeeded (0 while starting).", lambda: state["phases"].get("ready", 0))
+
+async def phase(name: str, awaitable):
+    t0 = time.perf_counter()
+    result = await awaitable
+    state["phases"][name] = round(time.perf_counter() - t0, 3)
+    return result
+
+async def warm():
+    await phase("geo", asyncio.to_thread(zip_index))
+    await phase("pool", warm_pool(WARM_CONNECTIONS, HOT_QUERIES))
+    async with SessionLocal() as session:
+        if snapshot.serving_mode() == "memory":
+            snap = await phase("snapshot", snapshot.load_snapshot(session))
+            snapshot.swap(snap)
+        else:
+            await phase("vocabulary", ensure_vocabulary(session, await data_version(session)))
+
+async def run(refresh_interval: float):
+    t0 = time.perf_counter()
+    delay = 1.0
+    while True:
+        try:
+            await warm()
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state["error"] = repr(e)
+            print(f"warmup: failed ({e!r}), retrying in {delay:.0f}s", flush=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    state["phases"]["ready"] = round(time.perf_counter() - t0, 3)
+    state["ready"], state["error"] = True, None
+    print("warmup: ready " + " ".join(f"{k}={v}s" for k, v in state["phases"].items()), flush=True)
+    if snapshot.serving_mode() == "memory":
+        await snapshot.refresh_loop(SessionLocal, refresh_interval)
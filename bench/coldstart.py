@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import socket
+import statistics
+import subprocess
+import httpx
+
+# Cold start: fresh-interpreter import time of app.main (and which heavy modules it pulls in), and with
+# --serve, a uvicorn process timed until the port accepts, /ready turns 200, and the first vs second
+# /providers request. --serve needs DATABASE_URL with data loaded.
+# python -m bench.coldstart [--serve] [--drg 470] [--repeat 5]
+
+HEAVY = ("pandas", "pgeocode", "openai")
+
+IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t); print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+)
+
+def import_times(repeat):
+    samples, heavy = [], ""
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True).stdout.split("\n")
+        samples.append(float(out[0]))
+        heavy = out[1]
+    return samples, heavy
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve(drg, timeout=120.0):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {}
+    try:
+        with httpx.Client(base_url=base, timeout=10) as client:
+            while time.perf_counter() - t0 < timeout:
+                try:
+                    r = client.get("/ready")
+                except httpx.TransportError:
+                    time.sleep(0.02)
+                    continue
+                result.setdefault("listening_s", round(time.perf_counter() - t0, 3))
+                if r.status_code == 200:
+                    result["ready_s"] = round(time.perf_counter() - t0, 3)
+                    result["startup_seconds"] = r.json()["startup_seconds"]
+                    break
+                result["last_ready_body"] = r.json()
+                time.sleep(0.05)
+            if "ready_s" not in result:
+                return result
+            for name in ("first_request_ms", "second_request_ms"):
+                t1 = time.perf_counter()
+                status = client.get("/providers", params={"drg": drg, "zip": "10001", "radius_km": 50}).status_code
+                result[name] = round((time.perf_counter() - t1) * 1000, 2)
+                result[name.replace("_ms", "_status")] = status
+    finally:
+        proc.terminate()
+        proc.wait()
+    return result
+
+def main(args):
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 5
+    drg = args[args.index("--drg") + 1] if "--drg" in args else "470"
+    samples, heavy = import_times(repeat)
+    print(f"import app.main: median {statistics.median(samples):.3f}s min {min(samples):.3f}s over {repeat} runs")
+    print(f"heavy modules loaded at import: {heavy or 'none'}")
+    if "--serve" in args:
+        print(json.dumps(serve(drg), indent=2))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
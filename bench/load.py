@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import httpx
+from bench.synthetic import generate, snapshot_frame
+
+# Async load driver for /providers and /ask with a DRG/ZIP/radius mix; prints latency percentiles and
+# writes the run as JSON so later runs can be compared (--compare).
+#   stand-in, no Postgres (in-process app on a memory snapshot):  python -m bench.load
+#   synthetic data through etl.py, then a running server:         python migrate.py && python -m bench.load --etl --url http://localhost:8000
+#   server already holding the same synthetic data:               python -m bench.load --url http://localhost:8000
+# Run servers with ENABLE_LLM=false so /ask exercises the offline parser.
+
+SCENARIOS = {
+    "providers_drg": 30,
+    "providers_radius": 25,
+    "providers_sorted_desc": 10,
+    "providers_next_page": 10,
+    "providers_text": 5,
+    "providers_rank": 10,
+    "ask": 10,
+}
+
+RADII_KM = (10, 25, 50, 100)
+
+SORT_KEYS = ("average_covered_charges", "average_total_payments", "total_discharges", "rating")
+
+def drg_words(definition):
+    words = [w for w in definition.split(" - ", 1)[-1].lower().replace("&", " ").split() if w.isalpha() and len(w) > 2]
+    return " ".join(words[:2])
+
+def build_workload(prices, n, seed):
+    rnd = random.Random(seed)
+    defs = prices["ms_drg_definition"].tolist()
+    zips = prices["provider_zip_code"].drop_duplicates().tolist()
+    names = list(SCENARIOS)
+    weights = list(SCENARIOS.values())
+    out = []
+    for _ in range(n):
+        scenario = rnd.choices(names, weights)[0]
+        definition = rnd.choice(defs)
+        code = definition.split(" - ", 1)[0]
+        z, radius = rnd.choice(zips), rnd.choice(RADII_KM)
+        if scenario == "ask":
+            if rnd.random() < 0.5:
+                q = f"Who is cheapest for {drg_words(definition)} near {z} within {radius} km?"
+            else:
+                q = f"Best rated hospital for DRG {code} near {z} within {radius} miles"
+            out.append((scenario, "POST", "/ask", {"question": q}))
+            continue
+        params = {"drg": code, "limit": 50}
+        if scenario == "providers_radius":
+            params.update(zip=z, radius_km=radius, sort_by="distance_km")
+        elif scenario == "providers_sorted_desc":
+            params.update(sort_by=rnd.choice(SORT_KEYS), order="desc")
+        elif scenario == "providers_text":
+            params["drg"] = drg_words(definition)
+        elif scenario == "providers_rank":
+            params.update(zip=z, radius_km=radius, rank_by="score", limit=10)
+        out.append((scenario, "GET", "/providers", params))
+    return out
+
+async def issue(client, method, path, body):
+    t0 = time.perf_counter()
+    try:
+        if method == "GET":
+            r = await client.get(path, params=body)
+        else:
+            r = await client.post(path, json=body)
+        status = r.status_code
+        _ = r.content
+    except httpx.HTTPError:
+        r, status = None, 0
+    return r, status, (time.perf_counter() - t0) * 1000
+
+async def drive(client, workload, concurrency):
+    results = []
+    queue = iter(workload)
+
+    async def worker():
+        for scenario, method, path, body in queue:
+            r, status, ms = await issue(client, method, path, body)
+            if scenario == "providers_next_page":
+                results.append(("providers_drg", status, ms))
+                cursor = r.headers.get("x-next-cursor") if r is not None else None
+                if not cursor:
+                    continue
+                _, status, ms = await issue(client, method, path, {**body, "cursor": cursor})
+            results.append((scenario, status, ms))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - t0
+
+def percentiles(ms):
+    a = np.asarray(ms)
+    return {
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p90_ms": round(float(np.percentile(a, 90)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "max_ms": round(float(a.max()), 3),
+        "mean_ms": round(float(a.mean()), 3),
+    }
+
+def summarize(results, wall):
+    out = {"requests": len(results), "wall_s": round(wall, 3), "rps": round(len(results) / wall, 1)}
+    out["errors"] = sum(1 for _, status, _ in results if status == 0 or status >= 500)
+    out.update(percentiles([ms for _, _, ms in results]))
+    out["scenarios"] = {}
+    for name in SCENARIOS:
+        ms = [m for s, _, m in results if s == name]
+        if ms:
+            out["scenarios"][name] = {"requests": len(ms), **percentiles(ms)}
+    return out
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(s):
+    print(f"{s['requests']} requests in {s['wall_s']}s: {s['rps']} req/s, {s['errors']} errors")
+    print(f"{'scenario':<24}{'n':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, v in [("all", s), *s["scenarios"].items()]:
+        n = v["requests"]
+        print(f"{name:<24}{n:>7}{v['p50_ms']:>10.2f}{v['p90_ms']:>10.2f}{v['p99_ms']:>10.2f}{v['max_ms']:>10.2f}")
+
+def print_compare(old, new):
+    print(f"vs {old.get('git_commit')} ({old['timestamp']}):")
+    pairs = [("all", old["summary"], new["summary"])]
+    pairs += [(k, old["summary"]["scenarios"].get(k), v) for k, v in new["summary"]["scenarios"].items()]
+    for name, a, b in pairs:
+        if a:
+            print(f"{name:<24}p50 {a['p50_ms']:8.2f} -> {b['p50_ms']:8.2f}ms   p99 {a['p99_ms']:8.2f} -> {b['p99_ms']:8.2f}ms")
+    print(f"{'throughput':<24}{old['summary']['rps']} -> {new['summary']['rps']} req/s")
+
+async def run_etl(prices, ratings, workdir):
+    import etl
+    os.makedirs(workdir, exist_ok=True)
+    prices_path = os.path.join(workdir, "prices.csv")
+    ratings_path = os.path.join(workdir, "ratings.csv")
+    prices.to_csv(prices_path, index=False)
+    ratings.to_csv(ratings_path, index=False)
+    for var in ("ETL_CSV_URL", "ETL_SOURCES"):
+        os.environ.pop(var, None)
+    os.environ.update(ETL_CSV_PATH=prices_path, RATINGS_CSV_PATH=ratings_path, ETL_FORCE="true")
+    t0 = time.perf_counter()
+    await etl.load()
+    return {"rows": len(prices), "seconds": round(time.perf_counter() - t0, 3), "peak_rss_mb": round(etl.peak_rss_mb(), 1), "peak_worker_rss_mb": round(etl.peak_worker_rss_mb(), 1)}
+
+def stand_in_client(prices, ratings, cache):
+    os.environ["CACHE_BACKEND"] = "memory" if cache else "none"
+    os.environ["ENABLE_LLM"] = "false"
+    from app.main import app
+    from app import snapshot
+    snapshot.swap(snapshot.Snapshot(snapshot_frame(prices, ratings), 1))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stand-in")
+
+async def main(args):
+    t0 = time.perf_counter()
+    prices, ratings = generate(args.rows, args.providers, args.drgs, args.seed)
+    print(f"generated {len(prices)} rows in {time.perf_counter() - t0:.2f}s")
+    etl_result = await run_etl(prices, ratings, args.workdir) if args.etl else None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = stand_in_client(prices, ratings, args.cache)
+    workload = build_workload(prices, args.requests, args.seed)
+    async with client:
+        await drive(client, workload[:args.warmup], args.concurrency)
+        results, wall = await drive(client, workload, args.concurrency)
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "target": args.url or "stand-in",
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "etl": etl_result,
+        "summary": summarize(results, wall),
+    }
+    print_summary(run["summary"])
+    out = args.out or os.path.join("bench", "results", f"load-{run['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"results written to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_compare(json.load(f), run)
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(prog="python -m bench.load")
+    p.add_argument("--url", help="base URL of a running server; default is the in-process stand-in")
+    p.add_argument("--etl", action="store_true", help="load the synthetic data with etl.py into DATABASE_URL first")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--providers", type=int, default=3000)
+    p.add_argument("--drgs", type=int, default=None)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--requests", type=int, default=5000)
+    p.add_argument("--warmup", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--cache", action="store_true", help="keep the response cache on in the stand-in")
+    p.add_argument("--workdir", default="/tmp/msdrg-bench")
+    p.add_argument("--out")
+    p.add_argument("--compare", help="earlier results JSON to diff against")
+    return p.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,61 @@
+import re
+import sys
+import time
+import pandas as pd
+from app import nlp
+from etl import normalize
+
+# Offline parser throughput: the original per-call re.search version vs the precompiled
+# parser with DRG vocabulary resolution. python -m bench.parse_offline [csv] [iterations]
+
+QUESTIONS = [
+    "Who is cheapest for DRG 470 within 25 miles of 10001?",
+    "Who has the best ratings for heart surgery near 10032?",
+    "Top ratings for DRG 003 near 10029 within 60 km",
+    "Cheapest for knee replacement near 10016 within 30 km",
+    "What is the weather today?",
+    "cheapest sepsis treatment around 12305 within 15 mi",
+    "best hospital for kidney infection near 10016",
+]
+
+def legacy_parse(q):
+    d = {}
+    m = re.search(r"\bdrg\s*(\d{3})\b", q, re.IGNORECASE)
+    if m:
+        d["drg_code"] = int(m.group(1))
+    m = re.search(r"\b(\d{5})\b", q)
+    if m:
+        d["zip"] = m.group(1)
+    m = re.search(r"\b(\d+)\s*(?:km|kilometers|kilometres|miles|mi)\b", q, re.IGNORECASE)
+    if m:
+        v = float(m.group(1))
+        if re.search(r"\bmi|miles\b", q, re.IGNORECASE):
+            v = v * 1.60934
+        d["radius_km"] = v
+    if re.search(r"\bbest|highest|rating|quality\b", q, re.IGNORECASE):
+        d["intent"] = "quality"
+    else:
+        d["intent"] = "cost"
+    return d
+
+def throughput(fn, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        for q in QUESTIONS:
+            fn(q)
+    return iterations * len(QUESTIONS) / (time.perf_counter() - t0)
+
+def main(path, iterations):
+    df = normalize(pd.read_csv(path, dtype=str))
+    re.purge()
+    print(f"legacy:  {throughput(legacy_parse, iterations):,.0f} questions/s")
+    print(f"offline (no vocabulary): {throughput(nlp.parse_question_offline, iterations):,.0f} questions/s")
+    t0 = time.perf_counter()
+    nlp.vocabulary = nlp.DrgVocabulary(df[["ms_drg_code", "ms_drg_definition"]].drop_duplicates().itertuples(index=False))
+    print(f"vocabulary: {len(nlp.vocabulary.definitions)} codes, {len(nlp.vocabulary.tokens)} tokens, built in {(time.perf_counter() - t0) * 1000:.1f}ms")
+    print(f"offline (with vocabulary): {throughput(nlp.parse_question_offline, iterations):,.0f} questions/s")
+    for q in QUESTIONS:
+        print(f"  {q!r} -> {nlp.parse_question_offline(q)}")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "app/data/sample_prices_ny.csv", int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,54 @@
+import sys
+import time
+import random
+import asyncio
+from app.ranking import rank
+
+# One-pass column extraction + partition selection vs the previous /ask double full sort under asyncio.gather.
+# python -m bench.ranking [rows ...]
+
+def synthetic_rows(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        {
+            "provider_name": f"Provider {i}",
+            "average_covered_charges": None if rnd.random() < 0.01 else rnd.uniform(5000, 250000),
+            "rating_avg": None if rnd.random() < 0.05 else rnd.uniform(1, 10),
+            "distance_km": rnd.uniform(0, 80),
+        }
+        for i in range(n)
+    ]
+
+async def double_sort(enriched):
+    async def cheapest():
+        y = sorted(enriched, key=lambda x: (float("inf") if x["average_covered_charges"] is None else x["average_covered_charges"]))
+        return y[:5]
+    async def best():
+        y = sorted(enriched, key=lambda x: (-1 if x["rating_avg"] is None else x["rating_avg"]), reverse=True)
+        return y[:5]
+    return await asyncio.gather(cheapest(), best())
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main(sizes):
+    loop = asyncio.new_event_loop()
+    for n in sizes:
+        rows = synthetic_rows(n)
+        cheap, top = loop.run_until_complete(double_sort(rows))
+        one = rank(rows, ("cheapest", "best"), 5)
+        assert one["cheapest"] == cheap and one["best"] == top
+        repeat = max(3, 200000 // n)
+        legacy = timed(lambda: loop.run_until_complete(double_sort(rows)), repeat)
+        two = timed(lambda: rank(rows, ("cheapest", "best"), 5), repeat)
+        four = timed(lambda: rank(rows, k=5, radius_km=80), repeat)
+        print(f"rows={n:>7}: double sort {legacy:8.2f}ms | rank cheapest+best {two:8.2f}ms | rank all four {four:8.2f}ms")
+    loop.close()
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [500, 5000, 50000])
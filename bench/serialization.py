@@ -0,0 +1,94 @@
+import sys
+import json
+import time
+import random
+from collections import namedtuple
+from decimal import Decimal
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.engine import processors
+from app.crud import PROVIDER_FIELDS, row_to_dict
+from app.schemas import ProviderOut
+
+# /providers page serialization: the previous per-field row_to_dict + dict(r) copy + response_model
+# validation + json.dumps, vs Float-typed rows zipped into dicts and written with orjson.
+# python -m bench.serialization [rows ...]
+
+Row = namedtuple("Row", ("id",) + PROVIDER_FIELDS)
+
+NUMERIC = ("average_covered_charges", "average_total_payments", "average_medicare_payments", "rating_avg")
+
+def synthetic_rows(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        Row(
+            i, f"{330000 + i}", f"Provider {i} General Hospital", "Albany", "NY", "12208",
+            "470 - Major Hip and Knee Joint Replacement or Reattachment of Lower Extremity w/o MCC", 470, rnd.randint(11, 400),
+            Decimal(f"{rnd.uniform(5000, 250000):.2f}"), Decimal(f"{rnd.uniform(2000, 60000):.2f}"), Decimal(f"{rnd.uniform(1500, 50000):.2f}"),
+            None if rnd.random() < 0.05 else Decimal(f"{rnd.uniform(1, 10):.4f}"), rnd.uniform(0, 80), 2022,
+        )
+        for i in range(n)
+    ]
+
+def legacy_row_to_dict(row):
+    return {
+        "provider_id": row.provider_id,
+        "provider_name": row.provider_name,
+        "provider_city": row.provider_city,
+        "provider_state": row.provider_state,
+        "provider_zip_code": row.provider_zip_code,
+        "ms_drg_definition": row.ms_drg_definition,
+        "ms_drg_code": row.ms_drg_code,
+        "total_discharges": int(row.total_discharges) if row.total_discharges is not None else None,
+        "average_covered_charges": float(row.average_covered_charges) if row.average_covered_charges is not None else None,
+        "average_total_payments": float(row.average_total_payments) if row.average_total_payments is not None else None,
+        "average_medicare_payments": float(row.average_medicare_payments) if row.average_medicare_payments is not None else None,
+        "rating_avg": float(row.rating_avg) if row.rating_avg is not None else None,
+        "distance_km": float(row.distance_km) if row.distance_km is not None else None,
+        "data_year": row.data_year
+    }
+
+adapter = TypeAdapter(List[ProviderOut])
+
+def legacy(rows):
+    out = [dict(r) for r in [legacy_row_to_dict(row) for row in rows]]
+    # what FastAPI's serialize_response + JSONResponse.render do for response_model=List[ProviderOut]
+    value = adapter.dump_python(adapter.validate_python(out), mode="json")
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def typed(rows):
+    # SQLAlchemy's Float result processor, which the type_coerce'd columns now go through while fetching
+    idx = [PROVIDER_FIELDS.index(c) + 1 for c in NUMERIC]
+    out = []
+    for row in rows:
+        r = list(row)
+        for i in idx:
+            r[i] = processors.to_float(r[i])
+        out.append(Row(*r))
+    return out
+
+def lean(rows):
+    return orjson.dumps([row_to_dict(row) for row in rows])
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main(sizes):
+    for n in sizes:
+        rows = synthetic_rows(n)
+        fetched = typed(rows)
+        assert json.loads(legacy(rows)) == json.loads(lean(fetched))
+        repeat = max(5, 20000 // n)
+        before = timed(lambda: legacy(rows), repeat)
+        convert = timed(lambda: typed(rows), repeat)
+        after = timed(lambda: lean(fetched), repeat)
+        print(f"rows={n:>6}: before {before:8.3f}ms | after {after:8.3f}ms (+{convert:.3f}ms Float fetch processing) | {before / (after + convert):5.1f}x")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 200, 1000])
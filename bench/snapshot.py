@@ -0,0 +1,85 @@
+import sys
+import time
+import random
+import asyncio
+import numpy as np
+import pandas as pd
+from app.snapshot import Snapshot, load_snapshot
+from app.crud import providers_page
+
+# Per-request latency of the in-memory snapshot vs the SQL path for /providers pages.
+# python -m bench.snapshot [rows]          synthetic snapshot only
+# python -m bench.snapshot --db 470 291    snapshot loaded from DATABASE_URL vs providers_page
+
+def synthetic_frame(n, codes=500, seed=7):
+    rnd = np.random.default_rng(seed)
+    code = rnd.integers(1, codes + 1, n)
+    charges = rnd.uniform(5000, 250000, n)
+    charges[rnd.random(n) < 0.01] = np.nan
+    ratings = rnd.uniform(1, 10, n)
+    ratings[rnd.random(n) < 0.05] = np.nan
+    providers = rnd.integers(0, 3000, n)
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "provider_id": [f"{p:06d}" for p in providers],
+        "provider_name": [f"Provider {p}" for p in providers],
+        "provider_city": "Springfield",
+        "provider_state": "IL",
+        "provider_zip_code": "62701",
+        "latitude": rnd.uniform(25, 48, n),
+        "longitude": rnd.uniform(-123, -70, n),
+        "ms_drg_definition": [f"{c:03d} - SYNTHETIC DRG {c}" for c in code],
+        "ms_drg_code": code,
+        "total_discharges": rnd.integers(11, 500, n),
+        "average_covered_charges": charges,
+        "average_total_payments": charges * 0.3,
+        "average_medicare_payments": charges * 0.25,
+        "rating_avg": ratings,
+        "data_year": 2022,
+    })
+
+def latency(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+def report(label, p50, p99):
+    print(f"{label:<48} p50 {p50:8.3f}ms  p99 {p99:8.3f}ms")
+
+def run_snapshot(snap, codes, repeat=200):
+    center = (41.88, -87.63)
+    for code in codes:
+        report(f"snapshot drg={code} page", *latency(lambda: snap.page(code, None, limit=50), repeat))
+        report(f"snapshot drg={code} page zip+radius", *latency(lambda: snap.page(code, None, center, 500, limit=50), repeat))
+        report(f"snapshot drg={code} all rows", *latency(lambda: snap.providers(code, None), repeat))
+
+async def run_db(codes, repeat=50):
+    from app.database import SessionLocal
+    async with SessionLocal() as session:
+        t0 = time.perf_counter()
+        snap = await load_snapshot(session)
+        print(f"loaded snapshot: {snap.size} rows in {time.perf_counter() - t0:.2f}s")
+        run_snapshot(snap, codes)
+        for code in codes:
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                await providers_page(session, code, None, None, None, None, "asc", 50, 0, None, None)
+                samples.append((time.perf_counter() - t0) * 1000)
+            report(f"sql drg={code} page", np.percentile(samples, 50), np.percentile(samples, 99))
+
+def main(args):
+    if args and args[0] == "--db":
+        asyncio.run(run_db([int(a) for a in args[1:]] or [470, 291, 871]))
+        return
+    n = int(args[0]) if args else 200000
+    t0 = time.perf_counter()
+    snap = Snapshot(synthetic_frame(n), 1)
+    print(f"built snapshot: {n} rows in {time.perf_counter() - t0:.2f}s")
+    run_snapshot(snap, random.Random(7).sample(range(1, 501), 3))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
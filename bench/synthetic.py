@@ -0,0 +1,77 @@
+import sys
+import numpy as np
+import pandas as pd
+from app.utils.geo import zip_dataset, zip_index
+from etl import normalize, providers_frame
+
+# CMS-shaped synthetic price and rating files at configurable scale.
+# python -m bench.synthetic out_prices.csv out_ratings.csv [rows] [providers] [drgs]
+
+SAMPLE_CSV = "app/data/sample_prices_ny.csv"
+
+def drg_definitions(n=None):
+    defs = pd.read_csv(SAMPLE_CSV, usecols=["ms_drg_definition"])["ms_drg_definition"]
+    defs = sorted(defs.drop_duplicates().tolist())
+    return defs[:n] if n else defs
+
+def zip_places(n, rnd):
+    lat, _ = zip_index()
+    zips = rnd.choice(np.flatnonzero(~np.isnan(lat)), n)
+    codes = [f"{z:05d}" for z in zips]
+    places = zip_dataset().assign(zip5=lambda d: d["postal_code"].str.slice(0, 5)).drop_duplicates("zip5").set_index("zip5")
+    places = places.reindex(codes)
+    return codes, places["place_name"].fillna("Springfield").tolist(), places["state_code"].fillna("NA").tolist()
+
+def generate(rows=100000, providers=3000, drgs=None, seed=7):
+    rnd = np.random.default_rng(seed)
+    defs = drg_definitions(drgs)
+    zips, cities, states = zip_places(providers, rnd)
+    # A few DRGs account for most discharges, like the real file.
+    weights = 1.0 / np.arange(1, len(defs) + 1)
+    p = rnd.integers(0, providers, rows)
+    d = rnd.choice(len(defs), rows, p=weights / weights.sum())
+    pairs = pd.DataFrame({"p": p, "d": d}).drop_duplicates()
+    p, d = pairs["p"].to_numpy(), pairs["d"].to_numpy()
+    n = len(pairs)
+    charges = np.round(rnd.lognormal(11, 0.6, n), 2)
+    total = np.round(charges * rnd.uniform(0.15, 0.35, n), 2)
+    prices = pd.DataFrame({
+        "provider_id": [f"{330000 + i}" for i in p],
+        "provider_name": [f"{cities[i]} General Hospital {i}" for i in p],
+        "provider_city": [cities[i] for i in p],
+        "provider_state": [states[i] for i in p],
+        "provider_zip_code": [zips[i] for i in p],
+        "ms_drg_definition": [defs[i] for i in d],
+        "total_discharges": rnd.integers(11, 400, n),
+        "average_covered_charges": charges,
+        "average_total_payments": total,
+        "average_medicare_payments": np.round(total * rnd.uniform(0.75, 0.95, n), 2),
+    })
+    rated = rnd.choice(providers, providers // 2, replace=False)
+    per = rnd.integers(1, 6, len(rated))
+    ratings = pd.DataFrame({
+        "provider_id": [f"{330000 + i}" for i in np.repeat(rated, per)],
+        "rating": rnd.integers(1, 11, per.sum()),
+    })
+    return prices, ratings
+
+def snapshot_frame(prices: pd.DataFrame, ratings: pd.DataFrame, year=None) -> pd.DataFrame:
+    # What app.snapshot.load_frame would read back after etl.py loaded these files.
+    df = normalize(prices.astype({"provider_zip_code": str}))
+    coords = providers_frame(df)[["provider_id", "latitude", "longitude"]]
+    avg = ratings.groupby("provider_id")["rating"].mean().rename("rating_avg").reset_index()
+    out = df.merge(coords, on="provider_id", how="left").merge(avg, on="provider_id", how="left")
+    return out.assign(id=np.arange(1, len(out) + 1), data_year=year)
+
+def main(args):
+    prices_path, ratings_path = args[0], args[1]
+    rows = int(args[2]) if len(args) > 2 else 100000
+    providers = int(args[3]) if len(args) > 3 else 3000
+    drgs = int(args[4]) if len(args) > 4 else None
+    prices, ratings = generate(rows, providers, drgs)
+    prices.to_csv(prices_path, index=False)
+    ratings.to_csv(ratings_path, index=False)
+    print(f"wrote {len(prices)} price rows for {prices['provider_id'].nunique()} providers to {prices_path}, {len(ratings)} ratings to {ratings_path}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
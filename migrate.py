@@ -1,16 +1,24 @@
 import os
 import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 
+MIGRATIONS = ["migrations/001_init.sql", "migrations/002_indexes.sql", "migrations/003_provider_coords.sql", "migrations/004_sort_indexes.sql", "migrations/005_rating_stats.sql", "migrations/006_incremental_etl.sql", "migrations/007_data_version.sql", "migrations/008_data_year.sql", "migrations/009_desc_sort_indexes.sql", "migrations/010_rating_stats_changes.sql"]
+
+LEDGER = "CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY, applied_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW())"
+
 def split_sql(sql: str):
     parts = []
     cur = []
+    in_body = False
     for line in sql.splitlines():
         s = line.strip()
         if not s:
             continue
         cur.append(line)
-        if s.endswith(";"):
+        if s.count("$$") % 2:
+            in_body = not in_body
+        if s.endswith(";") and not in_body:
             parts.append("\n".join(cur).rstrip(";").strip())
             cur = []
     if cur:
@@ -21,11 +29,17 @@ async def run():
     url = os.getenv("DATABASE_URL", "")
     engine = create_async_engine(url, echo=False)
     async with engine.begin() as conn:
-        for fname in ["migrations/001_init.sql", "migrations/002_indexes.sql"]:
+        await conn.exec_driver_sql(LEDGER)
+        applied = set((await conn.execute(text("SELECT name FROM schema_migrations"))).scalars())
+        for fname in MIGRATIONS:
+            name = os.path.basename(fname)
+            if name in applied:
+                continue
             with open(fname, "r", encoding="utf-8") as f:
                 sql = f.read()
             for stmt in split_sql(sql):
                 await conn.exec_driver_sql(stmt)
+            await conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
     await engine.dispose()
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+ALTER TABLE providers ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE providers ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+CREATE INDEX IF NOT EXISTS idx_providers_latlon ON providers(latitude, longitude);
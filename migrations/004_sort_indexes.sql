@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS idx_drg_prices_code_covered ON drg_prices(ms_drg_code, average_covered_charges, id);
+CREATE INDEX IF NOT EXISTS idx_drg_prices_code_total ON drg_prices(ms_drg_code, average_total_payments, id);
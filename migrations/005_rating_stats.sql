@@ -0,0 +1,27 @@
+CREATE TABLE IF NOT EXISTS provider_rating_stats (
+  provider_id TEXT PRIMARY KEY REFERENCES providers(provider_id) ON DELETE CASCADE,
+  rating_count BIGINT NOT NULL DEFAULT 0,
+  rating_sum BIGINT NOT NULL DEFAULT 0,
+  rating_avg NUMERIC
+);
+CREATE OR REPLACE FUNCTION provider_rating_stats_on_insert() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO provider_rating_stats (provider_id, rating_count, rating_sum, rating_avg)
+  SELECT provider_id, COUNT(*), SUM(rating), AVG(rating)
+  FROM new_rows
+  GROUP BY provider_id
+  ON CONFLICT (provider_id) DO UPDATE SET
+    rating_count = provider_rating_stats.rating_count + EXCLUDED.rating_count,
+    rating_sum = provider_rating_stats.rating_sum + EXCLUDED.rating_sum,
+    rating_avg = (provider_rating_stats.rating_sum + EXCLUDED.rating_sum)::numeric / (provider_rating_stats.rating_count + EXCLUDED.rating_count);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS trg_ratings_stats ON ratings;
+CREATE TRIGGER trg_ratings_stats AFTER INSERT ON ratings REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_stats_on_insert();
+INSERT INTO provider_rating_stats (provider_id, rating_count, rating_sum, rating_avg)
+SELECT provider_id, COUNT(*), SUM(rating), AVG(rating) FROM ratings GROUP BY provider_id
+ON CONFLICT (provider_id) DO UPDATE SET
+  rating_count = EXCLUDED.rating_count,
+  rating_sum = EXCLUDED.rating_sum,
+  rating_avg = EXCLUDED.rating_avg;
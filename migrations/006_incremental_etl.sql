@@ -0,0 +1,20 @@
+CREATE TABLE IF NOT EXISTS etl_sources (
+  source TEXT PRIMARY KEY,
+  content_hash TEXT NOT NULL,
+  fingerprint TEXT,
+  row_count BIGINT,
+  loaded_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
+DO $$
+BEGIN
+  -- only before the natural key first exists; once 008 adds data_year these keys repeat across years
+  IF to_regclass('uq_drg_prices_natural') IS NULL AND to_regclass('uq_drg_prices_natural_year') IS NULL THEN
+    DELETE FROM drg_prices a USING drg_prices b
+    WHERE a.id > b.id
+      AND a.provider_id = b.provider_id
+      AND a.ms_drg_code IS NOT DISTINCT FROM b.ms_drg_code
+      AND a.ms_drg_definition = b.ms_drg_definition;
+    CREATE UNIQUE INDEX uq_drg_prices_natural ON drg_prices(provider_id, ms_drg_code, ms_drg_definition) NULLS NOT DISTINCT;
+  END IF;
+END
+$$;
@@ -0,0 +1,4 @@
+ALTER TABLE drg_prices ADD COLUMN IF NOT EXISTS data_year SMALLINT;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_drg_prices_natural_year ON drg_prices(provider_id, ms_drg_code, ms_drg_definition, data_year) NULLS NOT DISTINCT;
+DROP INDEX IF EXISTS uq_drg_prices_natural;
+CREATE INDEX IF NOT EXISTS idx_drg_prices_code_year ON drg_prices(ms_drg_code, data_year);
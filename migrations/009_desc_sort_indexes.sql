@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS idx_drg_prices_code_covered_desc ON drg_prices(ms_drg_code, average_covered_charges DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_drg_prices_code_total_desc ON drg_prices(ms_drg_code, average_total_payments DESC NULLS LAST, id DESC);
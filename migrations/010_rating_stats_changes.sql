@@ -0,0 +1,38 @@
+CREATE OR REPLACE FUNCTION provider_rating_stats_recompute(ids TEXT[]) RETURNS void AS $$
+BEGIN
+  DELETE FROM provider_rating_stats s
+  WHERE s.provider_id = ANY(ids)
+    AND NOT EXISTS (SELECT 1 FROM ratings r WHERE r.provider_id = s.provider_id);
+  INSERT INTO provider_rating_stats (provider_id, rating_count, rating_sum, rating_avg)
+  SELECT provider_id, COUNT(*), SUM(rating), AVG(rating)
+  FROM ratings
+  WHERE provider_id = ANY(ids)
+  GROUP BY provider_id
+  ON CONFLICT (provider_id) DO UPDATE SET
+    rating_count = EXCLUDED.rating_count,
+    rating_sum = EXCLUDED.rating_sum,
+    rating_avg = EXCLUDED.rating_avg;
+END;
+$$ LANGUAGE plpgsql;
+CREATE OR REPLACE FUNCTION provider_rating_stats_on_change() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' THEN
+    PERFORM provider_rating_stats_recompute(ARRAY(SELECT provider_id FROM old_rows UNION SELECT provider_id FROM new_rows));
+  ELSE
+    PERFORM provider_rating_stats_recompute(ARRAY(SELECT DISTINCT provider_id FROM old_rows));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE OR REPLACE FUNCTION provider_rating_stats_on_truncate() RETURNS trigger AS $$
+BEGIN
+  DELETE FROM provider_rating_stats;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS trg_ratings_stats_update ON ratings;
+CREATE TRIGGER trg_ratings_stats_update AFTER UPDATE ON ratings REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_stats_on_change();
+DROP TRIGGER IF EXISTS trg_ratings_stats_delete ON ratings;
+CREATE TRIGGER trg_ratings_stats_delete AFTER DELETE ON ratings REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_stats_on_change();
+DROP TRIGGER IF EXISTS trg_ratings_stats_truncate ON ratings;
+CREATE TRIGGER trg_ratings_stats_truncate AFTER TRUNCATE ON ratings FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_stats_on_truncate();
@@ -0,0 +1,26 @@
+from app.nlp import DrgVocabulary
+
+ENTRIES = [
+    (291, "291 - Heart Failure & Shock w MCC"),
+    (292, "292 - Heart Failure & Shock w CC"),
+    (293, "293 - Heart Failure & Shock w/o CC/MCC"),
+    (469, "469 - Major Hip and Knee Joint Replacement or Reattachment of Lower Extremity w MCC"),
+    (470, "470 - Major Hip and Knee Joint Replacement or Reattachment of Lower Extremity w/o MCC"),
+]
+
+vocabulary = DrgVocabulary(ENTRIES)
+
+def test_exact_definition_resolves_to_its_code():
+    for code, definition in ENTRIES:
+        assert vocabulary.resolve(definition)[0] == [code]
+
+def test_definition_spelled_out_resolves_to_its_code():
+    assert vocabulary.resolve("HEART FAILURE AND SHOCK WITH CC")[0] == [292]
+    assert vocabulary.resolve("heart failure and shock without cc/mcc")[0] == [293]
+
+def test_substring_matches_every_definition_containing_it():
+    assert vocabulary.resolve("heart failure")[0] == [291, 292, 293]
+
+def test_token_fallback_keeps_severity_qualifiers():
+    assert vocabulary.resolve("knee replacement with mcc")[0] == [469]
+    assert vocabulary.resolve("hip replacement")[0] == [469, 470]